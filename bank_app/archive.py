@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from .models import ArchivedPeriod, ArchivedTransaction, Transaction
+
+ARCHIVE_TABLE = ArchivedTransaction._meta.db_table
+ARCHIVE_BATCH_SIZE = 5000
+ARCHIVED_FIELDS = ['id', 'transaction_id', 'bank_account_id', 'amount', 'currency', 'transaction_type',
+                   'created_at', 'transfer_id']
+
+
+def month_start(value):
+    # Periods are calendar months in UTC
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_month(value):
+    return datetime(value.year + value.month // 12, value.month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def archive_cutoff():
+    # Every transaction created before this instant is in the archive; None if
+    # nothing has been archived yet
+    latest = ArchivedPeriod.objects.aggregate(month=Max('month'))['month']
+    return next_month(latest) if latest else None
+
+
+def history_querysets(start=None, end=None, **filters):
+    # The querysets holding transactions in [start, end), oldest storage first.
+    # The archive is only consulted when the range reaches back past the cutoff;
+    # the hot table always is, since a month being archived is split across both.
+    cutoff = archive_cutoff()
+    querysets = [Transaction.objects.filter(**filters)]
+    if cutoff is not None and (start is None or start < cutoff):
+        querysets.insert(0, ArchivedTransaction.objects.filter(**filters))
+
+    if start:
+        querysets = [queryset.filter(created_at__gte=start) for queryset in querysets]
+    if end:
+        querysets = [queryset.filter(created_at__lt=end) for queryset in querysets]
+    return querysets
+
+
+class TransactionHistory:
+    # Hot and archived transactions behind the queryset methods the history views
+    # and cursor pagination use. Archived rows are all older than hot ones, so a
+    # newest-first page only reads the archive once the hot table runs out.
+
+    def __init__(self, querysets, descending=False):
+        self.querysets = querysets
+        self.descending = descending
+
+    def filter(self, *args, **kwargs):
+        return TransactionHistory([queryset.filter(*args, **kwargs) for queryset in self.querysets],
+                                  self.descending)
+
+    def order_by(self, *fields):
+        return TransactionHistory([queryset.order_by(*fields) for queryset in self.querysets],
+                                  bool(fields) and fields[0].startswith('-'))
+
+    def values_list(self, *fields, **kwargs):
+        return TransactionHistory([queryset.values_list(*fields, **kwargs) for queryset in self.querysets],
+                                  self.descending)
+
+    def _in_order(self):
+        return reversed(self.querysets) if self.descending else self.querysets
+
+    def __iter__(self):
+        for queryset in self._in_order():
+            yield from queryset
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.stop is None or key.step or (key.start or 0) < 0:
+            raise TypeError("TransactionHistory only supports bounded slices.")
+        rows = []
+        for queryset in self._in_order():
+            if len(rows) >= key.stop:
+                break
+            rows.extend(queryset[:key.stop - len(rows)])
+        return rows[key.start or 0:key.stop]
+
+
+def transaction_history(start=None, end=None, **filters):
+    return TransactionHistory(history_querysets(start, end, **filters))
+
+
+def _ensure_partition(month):
+    # Splits this month's partition off p_future; DDL commits implicitly on MySQL,
+    # so this runs outside the row-moving transactions
+    if connection.vendor != 'mysql':
+        return
+    name = f'p{month:%Y%m}'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM information_schema.PARTITIONS '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME = %s',
+            [ARCHIVE_TABLE, name],
+        )
+        if cursor.fetchone():
+            return
+        cursor.execute(
+            f"ALTER TABLE {ARCHIVE_TABLE} REORGANIZE PARTITION p_future INTO ("
+            f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{next_month(month):%Y-%m-%d}')), "
+            f"PARTITION p_future VALUES LESS THAN MAXVALUE)"
+        )
+
+
+def archive_month(month, batch_size=ARCHIVE_BATCH_SIZE):
+    _ensure_partition(month)
+    # Recorded before any row moves, so from here on reads of this month consult the archive
+    period, _ = ArchivedPeriod.objects.get_or_create(month=month.date())
+    hot = Transaction.objects.filter(created_at__gte=month, created_at__lt=next_month(month))
+    moved = 0
+    while True:
+        # Each batch is copied and deleted atomically, so a row is always in exactly one table
+        with transaction.atomic():
+            rows = list(hot.order_by('id').values_list(*ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                break
+            ArchivedTransaction.objects.bulk_create(
+                [ArchivedTransaction(**dict(zip(ARCHIVED_FIELDS, row))) for row in rows]
+            )
+            Transaction.objects.filter(id__in=[row[0] for row in rows]).delete()
+        moved += len(rows)
+
+    ArchivedPeriod.objects.filter(pk=period.pk).update(transaction_count=F('transaction_count') + moved)
+    return moved
+
+
+def archive_transactions(keep_months=None, batch_size=ARCHIVE_BATCH_SIZE):
+    # Moves every closed month older than the last keep_months months, oldest first,
+    # so the cutoff only ever advances over complete months
+    if keep_months is None:
+        keep_months = getattr(settings, 'TRANSACTION_HOT_MONTHS', 12)
+    boundary = month_start(timezone.now())
+    for _ in range(keep_months):
+        boundary = month_start(boundary - timedelta(days=1))
+
+    month = archive_cutoff()
+    if month is None:
+        oldest = Transaction.objects.aggregate(created_at=Min('created_at'))['created_at']
+        month = month_start(oldest) if oldest else boundary
+
+    months = moved = 0
+    while month < boundary:
+        moved += archive_month(month, batch_size)
+        months += 1
+        month = next_month(month)
+    return months, moved
@@ -0,0 +1,121 @@
+import base64
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import APIException
+
+from .archive import history_querysets
+from .authentication import StatelessJWTAuthentication
+from .models import BankAccount, DebitCard
+from .pagination import TransactionCursorPagination
+from .serializers import BankAccountSerializer, DebitCardSerializer, TransactionSerializer
+
+# Plain Django async views: DRF generic views are sync-only, so these re-create the
+# authentication and permission checks of their sync counterparts and read through
+# the async ORM. Under ASGI a slow query no longer pins a worker thread.
+
+authenticator = StatelessJWTAuthentication()
+
+
+def client_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return HttpResponseNotAllowed(['GET'])
+        try:
+            # Only tokens without role claims (or the revocation check) touch the
+            # database here, so this is usually a cheap thread hop
+            result = await sync_to_async(authenticator.authenticate)(request)
+        except APIException as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+
+        if result is None:
+            response = JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+
+        request.principal = result[0]
+        if not request.principal.is_client:
+            return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _encode_cursor(transaction):
+    raw = f'{transaction.created_at.isoformat()}|{transaction.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        return (created_at, int(pk)) if created_at else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+@client_required
+async def client_retrieve_bank_account(request):
+    try:
+        bank_account = await BankAccount.objects.aget(user_id=request.principal.pk)
+    except BankAccount.DoesNotExist:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    serializer = BankAccountSerializer(bank_account)
+    if bank_account.balance_shards:
+        # The visible balance of a sharded account sums its shards through the sync ORM
+        return JsonResponse(await sync_to_async(lambda: serializer.data)())
+    return JsonResponse(serializer.data)
+
+
+@client_required
+async def client_transaction_list(request):
+    # Same (created_at, id) keyset as the sync view; the cursor carries the last row seen
+    paginator = TransactionCursorPagination
+    try:
+        page_size = min(int(request.GET.get('page_size', paginator.page_size)), paginator.max_page_size)
+    except ValueError:
+        page_size = paginator.page_size
+
+    position = None
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = _decode_cursor(cursor)
+        if position is None:
+            return JsonResponse({'detail': 'Invalid cursor'}, status=404)
+
+    # Newest first: archived rows are only read once the hot table runs out
+    querysets = await sync_to_async(history_querysets)(bank_account__user_id=request.principal.pk)
+    rows = []
+    for queryset in reversed(querysets):
+        queryset = queryset.order_by('-created_at', '-id')
+        if position:
+            created_at, pk = position
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        rows += [transaction async for transaction in queryset[:page_size + 1 - len(rows)]]
+        if len(rows) > page_size:
+            break
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        params = request.GET.copy()
+        params['cursor'] = _encode_cursor(rows[-1])
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+    return JsonResponse({
+        'next': next_url,
+        'previous': None,
+        'results': TransactionSerializer(rows, many=True).data,
+    })
+
+
+@client_required
+async def client_debit_cards(request):
+    cards = [card async for card in DebitCard.objects.filter(connected_account__user_id=request.principal.pk)]
+    if not cards:
+        return JsonResponse(["You do not have a debit card or it is not approved by the banker."], safe=False,
+                            status=400)
+    return JsonResponse(DebitCardSerializer(cards, many=True).data, safe=False)
@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import BankAccount
+
+CACHE_TIMEOUT = getattr(settings, 'ELIGIBILITY_CACHE_TIMEOUT', 300)
+
+_FIELDS = ('id', 'user_id', 'iban', 'currency', 'is_approved', 'balance_shards')
+
+
+class Eligibility(namedtuple('Eligibility',
+                             'account_id user_id iban currency is_approved balance_shards has_approved_card')):
+    # What the money-moving views need to know about an account, minus the balance,
+    # which changes on every movement and is never cached
+
+    def as_account(self):
+        return BankAccount(pk=self.account_id, user_id=self.user_id, iban=self.iban, currency=self.currency,
+                           is_approved=self.is_approved, balance_shards=self.balance_shards)
+
+
+# Bumped whenever the cached entry's shape changes, so a shared cache never hands
+# back entries written by an older release
+KEY_PREFIX = 'eligibility:v2'
+
+
+def _user_key(user_id):
+    return f'{KEY_PREFIX}:user:{user_id}'
+
+
+def _iban_key(iban):
+    return f'{KEY_PREFIX}:iban:{iban}'
+
+
+def _load(queryset):
+    rows = queryset.values(*_FIELDS, 'debitcard__is_approved')
+    return [
+        Eligibility(row['id'], row['user_id'], row['iban'], row['currency'], row['is_approved'],
+                    row['balance_shards'], bool(row['debitcard__is_approved']))
+        for row in rows
+    ]
+
+
+def _store(entries):
+    values = {}
+    for entry in entries:
+        values[_user_key(entry.user_id)] = entry
+        values[_iban_key(entry.iban)] = entry
+    cache.set_many(values, CACHE_TIMEOUT)
+
+
+def get_account_for_user(user_id):
+    entry = cache.get(_user_key(user_id))
+    if entry is None:
+        entries = _load(BankAccount.objects.filter(user_id=user_id))
+        if not entries:
+            raise BankAccount.DoesNotExist
+        entry = entries[0]
+        _store([entry])
+    return entry
+
+
+def get_account_for_iban(iban):
+    entry = cache.get(_iban_key(iban))
+    if entry is None:
+        entries = _load(BankAccount.objects.filter(iban=iban))
+        if not entries:
+            raise BankAccount.DoesNotExist
+        entry = entries[0]
+        _store([entry])
+    return entry
+
+
+def get_accounts_for_ibans(ibans):
+    # Cache hits come from one get_many; all misses are resolved in a single query
+    ibans = set(ibans)
+    cached = cache.get_many([_iban_key(iban) for iban in ibans])
+    found = {entry.iban: entry for entry in cached.values()}
+    missing = ibans - set(found)
+    if missing:
+        entries = _load(BankAccount.objects.filter(iban__in=missing))
+        _store(entries)
+        found.update((entry.iban, entry) for entry in entries)
+    return found
+
+
+def invalidate(user_id=None, iban=None):
+    keys = []
+    if user_id is not None:
+        keys.append(_user_key(user_id))
+    if iban is not None:
+        keys.append(_iban_key(iban))
+    cache.delete_many(keys)
+
+
+def invalidate_many(accounts):
+    # For bulk writes that bypass model signals
+    keys = []
+    for account in accounts:
+        keys.extend((_user_key(account.user_id), _iban_key(account.iban)))
+    cache.delete_many(keys)
+
+
+def invalidate_accounts(account_ids):
+    invalidate_many(BankAccount.objects.filter(pk__in=account_ids).only('user_id', 'iban'))
@@ -0,0 +1,52 @@
+import csv
+import json
+
+EXPORT_FIELDS = ['transaction_id', 'iban', 'amount', 'currency', 'transaction_type', 'created_at']
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    # csv.writer only needs an object with write(); hand the line straight back
+    def write(self, value):
+        return value
+
+
+def iter_transaction_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    # Walk the table in primary key ranges instead of relying on server-side
+    # cursors, which MySQL drivers do not provide; only one chunk is ever in memory
+    queryset = queryset.order_by('id').values_list(
+        'id', 'transaction_id', 'bank_account__iban', 'amount', 'currency', 'transaction_type', 'created_at'
+    )
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        for row in chunk:
+            yield row[1:]
+        last_id = chunk[-1][0]
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for transaction_id, iban, amount, currency, transaction_type, created_at in rows:
+        yield writer.writerow([transaction_id, iban, str(amount), currency, transaction_type, created_at.isoformat()])
+
+
+def stream_ndjson(rows):
+    for transaction_id, iban, amount, currency, transaction_type, created_at in rows:
+        yield json.dumps({
+            'transaction_id': transaction_id,
+            'iban': iban,
+            'amount': str(amount),
+            'currency': currency,
+            'transaction_type': transaction_type,
+            'created_at': created_at.isoformat(),
+        }) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
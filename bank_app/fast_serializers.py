@@ -0,0 +1,149 @@
+import decimal
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Sum
+from rest_framework import fields, relations
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601
+
+from . import metrics
+from .models import BalanceShard
+from .serializers import BankAccountSerializer, DebitCardSerializer, TransactionSerializer
+
+# Fields whose DRF representation of a database value is the value itself
+PASSTHROUGH_FIELDS = (fields.BooleanField, fields.CharField, fields.IntegerField, fields.ReadOnlyField)
+
+
+def _decimal_encoder(field):
+    if field.decimal_places is None or field.localize:
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+    if not getattr(field, 'coerce_to_string', fields.api_settings.COERCE_DECIMAL_TO_STRING):
+        return lambda value: value.quantize(exponent, rounding=rounding, context=context)
+    return lambda value: '{:f}'.format(value.quantize(exponent, rounding=rounding, context=context))
+
+
+def _datetime_encoder(field):
+    output_format = getattr(field, 'format', fields.api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def encode(value):
+        if value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return encode
+
+
+def _date_encoder(field):
+    output_format = getattr(field, 'format', fields.api_settings.DATE_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+    return lambda value: value.isoformat()
+
+
+def _encoder(field):
+    # None means the raw value is already what DRF would emit
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        return None
+    if isinstance(field, fields.ChoiceField):
+        if all(isinstance(value, str) for value in field.choice_strings_to_values.values()):
+            return None
+        return field.to_representation
+    if isinstance(field, fields.DecimalField):
+        return _decimal_encoder(field)
+    if isinstance(field, fields.DateTimeField):
+        return _datetime_encoder(field)
+    if isinstance(field, fields.DateField):
+        return _date_encoder(field)
+    if isinstance(field, PASSTHROUGH_FIELDS):
+        return None
+    return field.to_representation
+
+
+class ValuesSerializer:
+    # Read-only list serializer over values_list() rows. Field names, order and
+    # encodings come from model_serializer, so the JSON matches it byte for byte.
+    model_serializer = None
+
+    def __init__(self):
+        self.names = []
+        self.lookups = []
+        self.encoders = []
+        for name, field in self.model_serializer().fields.items():
+            if field.write_only:
+                continue
+            if '.' in field.source or field.source == '*':
+                raise ImproperlyConfigured(f"{self.model_serializer.__name__}.{name} is not a plain model field.")
+            self.names.append(name)
+            self.lookups.append(field.source)
+            self.encoders.append(_encoder(field))
+
+    def get_rows(self, queryset, named=False):
+        # Named rows let cursor pagination read its ordering field off each row
+        return queryset.values_list(*self.lookups, named=named)
+
+    def to_representation(self, rows):
+        names, encoders = self.names, self.encoders
+        return [
+            {
+                name: value if encode is None or value is None else encode(value)
+                for name, encode, value in zip(names, encoders, row)
+            }
+            for row in rows
+        ]
+
+
+class BankAccountValuesSerializer(ValuesSerializer):
+    model_serializer = BankAccountSerializer
+
+    def to_representation(self, rows):
+        data = super().to_representation(rows)
+        # Same visible balance as BankAccountSerializer, with one query for all sharded rows
+        sharded = [item['id'] for item in data if item['balance_shards']]
+        if sharded:
+            totals = defaultdict(lambda: decimal.Decimal('0'), BalanceShard.objects.filter(
+                bank_account_id__in=sharded).values('bank_account').annotate(total=Sum('balance')).values_list(
+                'bank_account', 'total'))
+            encode = self.encoders[self.names.index('balance')]
+            for item in data:
+                if item['balance_shards']:
+                    item['balance'] = encode(decimal.Decimal(item['balance']) + totals[item['id']])
+        return data
+
+
+class DebitCardValuesSerializer(ValuesSerializer):
+    model_serializer = DebitCardSerializer
+
+
+class TransactionValuesSerializer(ValuesSerializer):
+    model_serializer = TransactionSerializer
+
+
+class ValuesListMixin:
+    # For read-only ListAPIViews: skips building a serializer instance per row
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.values_serializer_class()
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if self.paginator is not None:
+            page = self.paginate_queryset(serializer.get_rows(queryset, named=True))
+            if page is not None:
+                with metrics.timer('serializer'):
+                    data = serializer.to_representation(page)
+                return self.get_paginated_response(data)
+
+        with metrics.timer('serializer'):
+            data = serializer.to_representation(serializer.get_rows(queryset))
+        return Response(data)
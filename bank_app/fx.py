@@ -0,0 +1,83 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ExchangeRate
+
+VERSION_KEY = 'fx:rates-version'
+RATE_QUANTUM = Decimal('0.00000001')
+MONEY_QUANTUM = Decimal('0.01')
+
+
+class UnknownCurrency(LookupError):
+    pass
+
+
+def base_currency():
+    return getattr(settings, 'FX_BASE_CURRENCY', 'EUR')
+
+
+class RateCache:
+    # In-process snapshot of the ExchangeRate table, so conversions never query.
+    # Every FX_RATE_CACHE_TTL seconds the shared version number is checked and the
+    # table is only reloaded if it changed (or if the version is unknown).
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rates = None
+        self._version = None
+        self._expires = 0.0
+
+    def rates(self):
+        if self._rates is None or time.monotonic() >= self._expires:
+            with self._lock:
+                if self._rates is None or time.monotonic() >= self._expires:
+                    self._refresh()
+        return self._rates
+
+    def _refresh(self):
+        version = cache.get(VERSION_KEY)
+        if self._rates is None or version is None or version != self._version:
+            rates = dict(ExchangeRate.objects.values_list('currency', 'rate'))
+            rates[base_currency()] = Decimal('1')
+            self._rates = rates
+            self._version = version
+        self._expires = time.monotonic() + getattr(settings, 'FX_RATE_CACHE_TTL', 60)
+
+    def invalidate(self):
+        with self._lock:
+            self._rates = None
+
+
+rate_cache = RateCache()
+
+
+def bump_version():
+    # Other processes pick the new rates up at their next TTL check, this one at once
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+    rate_cache.invalidate()
+
+
+def is_supported(currency):
+    return currency in rate_cache.rates()
+
+
+def rate(source, target):
+    # Target currency units per source currency unit, at the precision stored on transfers
+    if source == target:
+        return Decimal('1')
+    rates = rate_cache.rates()
+    try:
+        return (rates[target] / rates[source]).quantize(RATE_QUANTUM)
+    except KeyError:
+        raise UnknownCurrency(f"No exchange rate from {source} to {target}.")
+
+
+def convert(amount, exchange_rate):
+    return (amount * exchange_rate).quantize(MONEY_QUANTUM)
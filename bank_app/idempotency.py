@@ -0,0 +1,90 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def key_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def purge_expired_keys(now=None):
+    cutoff = (now or timezone.now()) - key_ttl()
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+class IdempotentCreateMixin:
+    # Replays the stored response for a repeated Idempotency-Key instead of running
+    # the money movement again. The key is reserved before the view runs, so two
+    # concurrent retries cannot both get through.
+
+    def post(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return super().post(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"detail": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        record = IdempotencyKey.objects.filter(user_id=request.user.pk, key=key).first()
+        if record is not None and record.created_at < timezone.now() - key_ttl():
+            record.delete()
+            record = None
+
+        if record is None:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(user_id=request.user.pk, key=key,
+                                                           request_fingerprint=fingerprint)
+            except IntegrityError:
+                record = IdempotencyKey.objects.filter(user_id=request.user.pk, key=key).first()
+            else:
+                return self._run_and_store(record, request, *args, **kwargs)
+
+        return self._replay(record, fingerprint)
+
+    def _run_and_store(self, record, request, *args, **kwargs):
+        try:
+            response = super().post(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            # Server errors are not final; let the client retry with the same key
+            record.delete()
+            return response
+
+        record.response_status = response.status_code
+        record.response_body = json.loads(JSONRenderer().render(response.data) or b'null')
+        record.save(update_fields=['response_status', 'response_body'])
+        return response
+
+    def _replay(self, record, fingerprint):
+        if record is None or record.response_status is None:
+            return Response({"detail": "A request with this Idempotency-Key is still being processed."},
+                            status=status.HTTP_409_CONFLICT)
+        if record.request_fingerprint != fingerprint:
+            return Response({"detail": f"This {IDEMPOTENCY_HEADER} was already used with a different request."},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        response = Response(record.response_body, status=record.response_status)
+        response['Idempotent-Replayed'] = 'true'
+        return response
@@ -0,0 +1,133 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import IdentifierSequence
+
+BLOCK_SIZE = getattr(settings, 'IDENTIFIER_BLOCK_SIZE', 100)
+IBAN_COUNTRY_CODE = getattr(settings, 'IBAN_COUNTRY_CODE', 'AL')
+IBAN_BANK_CODE = getattr(settings, 'IBAN_BANK_CODE', '00000000')
+CARD_IIN = getattr(settings, 'CARD_IIN', '400000')
+CARD_SEQUENCE_DIGITS = 9
+
+
+class IdentifierSpaceExhausted(Exception):
+    pass
+
+
+def _reserve(name, count):
+    # Hands back the first value of a freshly reserved [start, start + count) range
+    with transaction.atomic():
+        IdentifierSequence.objects.get_or_create(name=name)
+        start = IdentifierSequence.objects.select_for_update().values_list('next_value', flat=True).get(name=name)
+        IdentifierSequence.objects.filter(name=name).update(next_value=F('next_value') + count)
+    return start
+
+
+class BlockAllocator:
+    # Serves sequence values from an in-memory block so most allocations cost no
+    # query. A block reserved inside an open transaction could be rolled back and
+    # handed to another process, so in that case only what is needed right now is
+    # reserved and nothing is kept for later.
+
+    def __init__(self, name, block_size=BLOCK_SIZE):
+        self.name = name
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def allocate(self, count=1):
+        with self._lock:
+            taken = list(range(self._next, min(self._next + count, self._end)))
+            self._next += len(taken)
+            shortfall = count - len(taken)
+            if not shortfall:
+                return taken
+
+            if transaction.get_connection().in_atomic_block:
+                start = _reserve(self.name, shortfall)
+                return taken + list(range(start, start + shortfall))
+
+            start = _reserve(self.name, shortfall + self.block_size)
+            self._next = start + shortfall
+            self._end = self._next + self.block_size
+            return taken + list(range(start, start + shortfall))
+
+    def reset(self):
+        with self._lock:
+            self._next = self._end = 0
+
+
+account_ids = BlockAllocator('account_id')
+ibans = BlockAllocator('iban')
+card_numbers = BlockAllocator('card_number')
+
+
+def luhn_check_digit(digits):
+    total = 0
+    for index, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if index % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return str((10 - total % 10) % 10)
+
+
+def is_luhn_valid(number):
+    return number.isdigit() and luhn_check_digit(number[:-1]) == number[-1]
+
+
+def iban_check_digits(country_code, bban):
+    rearranged = bban + country_code + '00'
+    numeric = ''.join(str(int(char, 36)) for char in rearranged)
+    return f'{98 - int(numeric) % 97:02d}'
+
+
+def is_iban_valid(iban):
+    rearranged = iban[4:] + iban[:4]
+    return iban.isalnum() and int(''.join(str(int(char, 36)) for char in rearranged)) % 97 == 1
+
+
+def format_account_id(value):
+    body = f'{value:07d}'
+    return 'ACCT_' + body + luhn_check_digit(body)
+
+
+def format_iban(value):
+    bban = IBAN_BANK_CODE + f'{value:016d}'
+    return IBAN_COUNTRY_CODE + iban_check_digits(IBAN_COUNTRY_CODE, bban) + bban
+
+
+def format_card_number(value):
+    # A longer sequence part would no longer fit a 16-digit card number
+    if value >= 10 ** CARD_SEQUENCE_DIGITS:
+        raise IdentifierSpaceExhausted(f'No card numbers left under IIN {CARD_IIN}.')
+    body = CARD_IIN + f'{value:0{CARD_SEQUENCE_DIGITS}d}'
+    return body + luhn_check_digit(body)
+
+
+def generate_unique_account_id():
+    return format_account_id(account_ids.allocate()[0])
+
+
+def generate_unique_iban():
+    return format_iban(ibans.allocate()[0])
+
+
+def generate_unique_card_number():
+    return format_card_number(card_numbers.allocate()[0])
+
+
+def generate_card_numbers(count):
+    return [format_card_number(value) for value in card_numbers.allocate(count)]
+
+
+def calculate_expiration_date():
+    return timezone.now() + timedelta(days=365)
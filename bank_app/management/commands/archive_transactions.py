@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from bank_app.archive import ARCHIVE_BATCH_SIZE, archive_cutoff, archive_transactions
+
+
+class Command(BaseCommand):
+    help = 'Move transactions from closed months into the archive table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, default=None,
+                            help='Closed months to keep in the hot table (default: TRANSACTION_HOT_MONTHS).')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        months, moved = archive_transactions(keep_months=options['keep_months'], batch_size=options['batch_size'])
+        cutoff = archive_cutoff()
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} transactions from {months} months; '
+            f'hot table starts at {cutoff:%Y-%m-%d}.' if cutoff else f'Archived {moved} transactions.'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from bank_app.shards import compact_all
+
+
+class Command(BaseCommand):
+    help = 'Fold pending shard credits of sharded accounts back into their main balance.'
+
+    def handle(self, *args, **options):
+        compacted = compact_all()
+        for iban, amount in compacted.items():
+            self.stdout.write(f'{iban}: {amount}')
+        self.stdout.write(self.style.SUCCESS(f'Compacted {len(compacted)} sharded accounts.'))
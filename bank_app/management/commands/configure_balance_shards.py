@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bank_app.models import BankAccount
+from bank_app.shards import configure
+
+
+class Command(BaseCommand):
+    help = 'Set the number of balance shards for a high fan-in account (0 turns sharding off).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('iban')
+        parser.add_argument('shards', type=int)
+
+    def handle(self, *args, **options):
+        if not 0 <= options['shards'] <= 256:
+            raise CommandError('Shard count must be between 0 and 256.')
+        try:
+            account = BankAccount.objects.get(iban=options['iban'])
+        except BankAccount.DoesNotExist:
+            raise CommandError(f"No bank account with IBAN {options['iban']}.")
+
+        configure(account, options['shards'])
+        self.stdout.write(self.style.SUCCESS(f"{account.iban} now uses {options['shards']} balance shards."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from bank_app.reviews import DECISION_BATCH_SIZE, decide_debit_card_requests
+
+
+class Command(BaseCommand):
+    help = 'Approve or reject pending debit card requests by the automatic rules.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DECISION_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        outcome = decide_debit_card_requests(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Approved {outcome['approved']}, rejected {outcome['rejected']}, "
+            f"left {outcome['pending']} pending for review, {outcome['error']} errors."
+        ))
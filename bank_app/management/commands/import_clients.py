@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bank_app.onboarding import ClientImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk-import clients from a CSV, JSON or NDJSON file, hashing passwords on all cores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json', 'ndjson', 'jsonl'])
+        parser.add_argument('--workers', type=int, help='Hashing processes (defaults to the CPU count).')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--report', help='Write rejected rows as JSON to this file.')
+
+    def handle(self, *args, **options):
+        importer = ClientImporter(workers=options['workers'], chunk_size=options['chunk_size'])
+        try:
+            created, rejected = importer.run(read_rows(options['path'], options['format']))
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as handle:
+                json.dump(rejected, handle, indent=2)
+        else:
+            for row in rejected:
+                self.stdout.write(f"row {row['row']}: {row['username'] or '-'}: {row['reason']}")
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {created} clients, rejected {len(rejected)} rows.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from bank_app.rollups import rebuild_daily_balances
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-account daily balance rollup table from the transaction log.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_daily_balances(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} daily balance rows.'))
@@ -0,0 +1,53 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bank_app.tasks import LEASE_SECONDS, TaskQueue, claim_due_tasks
+
+
+class Command(BaseCommand):
+    help = 'Run background tasks queued in the database (TASK_QUEUE_BACKEND = "database").'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'TASK_QUEUE_WORKERS', 4))
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when no task is due.')
+        parser.add_argument('--lease', type=int, default=LEASE_SECONDS,
+                            help='Seconds before a claimed task is handed to another worker.')
+        parser.add_argument('--drain-timeout', type=float,
+                            default=getattr(settings, 'TASK_QUEUE_DRAIN_SECONDS', 10))
+        parser.add_argument('--once', action='store_true', help='Exit once no task is due.')
+
+    def handle(self, *args, **options):
+        queue = TaskQueue(workers=options['workers'], max_size=options['workers'] * 2)
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            stopping.set()
+
+        previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+        claimed = 0
+        try:
+            while not stopping.is_set():
+                # Only claim what the pool can start soon, so other workers get the rest
+                capacity = queue.max_size - queue.size()
+                jobs = claim_due_tasks(capacity, lease=options['lease']) if capacity > 0 else []
+                for job in jobs:
+                    queue.submit(job)
+                claimed += len(jobs)
+                if jobs:
+                    continue
+                if options['once'] and capacity == queue.max_size:
+                    break
+                stopping.wait(options['poll_interval'])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+        # On a stop signal, tasks already claimed get drain_timeout to finish; any
+        # left unfinished are picked up again once their lease runs out
+        drained = queue.shutdown(options['drain_timeout'])
+        self.stdout.write(self.style.SUCCESS(f'Processed {claimed} background tasks.') if drained else
+                          self.style.WARNING(f'Claimed {claimed} background tasks; some were still running.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from bank_app.velocity import seed
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the velocity limit counters from recent debits; run at deploy.'
+
+    def handle(self, *args, **options):
+        seeded = seed()
+        self.stdout.write(self.style.SUCCESS(f'Seeded velocity counters from {seeded} debits.'))
@@ -0,0 +1,34 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from bank_app.fx import base_currency
+from bank_app.models import ExchangeRate
+
+
+class Command(BaseCommand):
+    help = 'Create or update exchange rates against FX_BASE_CURRENCY, e.g. USD=1.0850 GBP=0.8570.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('rates', nargs='+', metavar='CURRENCY=RATE')
+
+    def handle(self, *args, **options):
+        rates = {}
+        for item in options['rates']:
+            currency, _, value = item.partition('=')
+            currency = currency.strip().upper()
+            try:
+                rate = Decimal(value)
+            except InvalidOperation:
+                raise CommandError(f'Invalid rate: {item}')
+            if len(currency) != 3 or not rate.is_finite() or rate <= 0:
+                raise CommandError(f'Invalid rate: {item}')
+            if currency == base_currency():
+                raise CommandError(f'{currency} is the base currency; its rate is always 1.')
+            rates[currency] = rate
+
+        with transaction.atomic():
+            for currency, rate in rates.items():
+                ExchangeRate.objects.update_or_create(currency=currency, defaults={'rate': rate})
+        self.stdout.write(self.style.SUCCESS(f'Updated {len(rates)} exchange rates.'))
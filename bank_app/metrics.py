@@ -0,0 +1,128 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds in seconds, Prometheus style; the implicit last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current_sample = ContextVar('metrics_sample', default=None)
+
+
+class RequestSample:
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.timings = {}
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.sql_queries += 1
+
+
+def start_sample():
+    sample = RequestSample()
+    return sample, _current_sample.set(sample)
+
+
+def end_sample(token):
+    _current_sample.reset(token)
+
+
+@contextmanager
+def timer(phase):
+    # No-op outside a sampled request, so instrumented code pays almost nothing
+    sample = _current_sample.get()
+    if sample is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.timings[phase] = sample.timings.get(phase, 0.0) + time.perf_counter() - started
+
+
+class _EndpointStats:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.phase_seconds = {}
+
+
+class Registry:
+    # Per-process; with several workers, scrape each one or aggregate upstream
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def observe(self, endpoint, method, status_code, seconds, sample):
+        key = (endpoint, method, str(status_code))
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EndpointStats()
+            stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            stats.count += 1
+            stats.latency_sum += seconds
+            stats.sql_queries += sample.sql_queries
+            stats.sql_seconds += sample.sql_seconds
+            for phase, phase_seconds in sample.timings.items():
+                stats.phase_seconds[phase] = stats.phase_seconds.get(phase, 0.0) + phase_seconds
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._stats.items())
+            lines = [
+                '# HELP bank_request_duration_seconds Request latency per URL name.',
+                '# TYPE bank_request_duration_seconds histogram',
+            ]
+            for (endpoint, method, status_code), stats in items:
+                labels = f'endpoint="{endpoint}",method="{method}",status="{status_code}"'
+                cumulative = 0
+                for bound, hits in zip(LATENCY_BUCKETS + ('+Inf',), stats.buckets):
+                    cumulative += hits
+                    lines.append(f'bank_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'bank_request_duration_seconds_sum{{{labels}}} {stats.latency_sum:.6f}')
+                lines.append(f'bank_request_duration_seconds_count{{{labels}}} {stats.count}')
+
+            lines += [
+                '# HELP bank_sql_queries_total SQL queries executed while serving requests.',
+                '# TYPE bank_sql_queries_total counter',
+            ]
+            lines += [
+                f'bank_sql_queries_total{{endpoint="{e}",method="{m}",status="{s}"}} {stats.sql_queries}'
+                for (e, m, s), stats in items
+            ]
+            lines += [
+                '# HELP bank_sql_duration_seconds_total Time spent in SQL while serving requests.',
+                '# TYPE bank_sql_duration_seconds_total counter',
+            ]
+            lines += [
+                f'bank_sql_duration_seconds_total{{endpoint="{e}",method="{m}",status="{s}"}} {stats.sql_seconds:.6f}'
+                for (e, m, s), stats in items
+            ]
+            lines += [
+                '# HELP bank_phase_duration_seconds_total Time spent per request phase (auth, serializer).',
+                '# TYPE bank_phase_duration_seconds_total counter',
+            ]
+            for (e, m, s), stats in items:
+                for phase, seconds in sorted(stats.phase_seconds.items()):
+                    lines.append(f'bank_phase_duration_seconds_total{{endpoint="{e}",method="{m}",status="{s}",'
+                                 f'phase="{phase}"}} {seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,36 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+
+class MetricsMiddleware:
+    # Records latency, SQL count/time and phase timings per URL name for a sampled
+    # fraction of requests (METRICS_SAMPLE_RATE); unsampled requests skip it all
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= getattr(settings, 'METRICS_SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        sample, token = metrics.start_sample()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample.sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.end_sample(token)
+
+        match = request.resolver_match
+        endpoint = match.url_name if match and match.url_name else 'unresolved'
+        metrics.registry.observe(endpoint, request.method, response.status_code,
+                                 time.perf_counter() - started, sample)
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:10
+
+import bank_app.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_app', '0009_balance_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transfer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(default=bank_app.models.generate_unique_transaction_id, max_length=32, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('currency', models.CharField(max_length=3)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('credit_account', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incoming_transfers', to='bank_app.bankaccount')),
+                ('debit_account', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outgoing_transfers', to='bank_app.bankaccount')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='transfer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='legs', to='bank_app.transfer', to_field='reference'),
+        ),
+        migrations.AddIndex(
+            model_name='transfer',
+            index=models.Index(fields=['debit_account', 'credit_account', 'created_at'], name='transfer_debit_credit'),
+        ),
+        migrations.AddIndex(
+            model_name='transfer',
+            index=models.Index(fields=['credit_account', 'created_at'], name='transfer_credit_created'),
+        ),
+    ]
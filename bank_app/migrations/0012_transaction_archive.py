@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def partition_archive(apps, schema_editor):
+    # MySQL only: monthly range partitions on created_at, which must be part of the
+    # primary key; archive_transactions splits a new partition off p_future per month
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    table = 'bank_app_archivedtransaction'
+    schema_editor.execute(f'ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)')
+    schema_editor.execute(f'ALTER TABLE {table} ROW_FORMAT=COMPRESSED')
+    schema_editor.execute(
+        f'ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS(created_at)) '
+        f'(PARTITION p_future VALUES LESS THAN MAXVALUE)'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_app', '0011_identifiersequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('transaction_id', models.CharField(db_index=True, max_length=255)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('currency', models.CharField(max_length=3)),
+                ('transaction_type', models.CharField(choices=[('DEBIT', 'Debit'), ('CREDIT', 'Credit')], max_length=10)),
+                ('created_at', models.DateTimeField()),
+                ('bank_account', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='bank_app.bankaccount')),
+                ('transfer', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_legs', to='bank_app.transfer', to_field='reference')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bank_account', 'created_at', 'transaction_type', 'amount'], name='archived_account_created'), models.Index(fields=['created_at'], name='archived_created')],
+            },
+        ),
+        migrations.RunPython(partition_archive, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def start_above_legacy_account_ids(apps, schema_editor):
+    # Legacy ids are ACCT_ plus eight hex characters. One that happens to be all
+    # digits has the shape of a sequential id, so the sequence starts past it.
+    BankAccount = apps.get_model('bank_app', 'BankAccount')
+    IdentifierSequence = apps.get_model('bank_app', 'IdentifierSequence')
+    account_ids = BankAccount.objects.filter(account_id__regex=r'^ACCT_[0-9]{8}$') \
+        .values_list('account_id', flat=True)
+    floor = max((int(account_id[5:12]) + 1 for account_id in account_ids.iterator()), default=1)
+    sequence, _ = IdentifierSequence.objects.get_or_create(name='account_id')
+    if sequence.next_value < floor:
+        IdentifierSequence.objects.filter(pk=sequence.pk).update(next_value=floor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_app', '0014_background_tasks'),
+    ]
+
+    operations = [
+        migrations.RunPython(start_above_legacy_account_ids, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 import uuid
 
 class CustomUser(AbstractUser):
@@ -16,6 +17,36 @@ class BankAccount(models.Model):
     currency = models.CharField(max_length=3, default='EUR')
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     is_approved = models.BooleanField(default=False)
+    # Number of BalanceShard rows that absorb credits for this account; 0 disables sharding
+    balance_shards = models.PositiveSmallIntegerField(default=0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Owner and IBAN as loaded, so a save that changes them also drops the
+        # eligibility entries cached under the old values
+        loaded = dict(zip(field_names, values))
+        instance._loaded_keys = (loaded.get('user_id'), loaded.get('iban'))
+        return instance
+
+    def get_visible_balance(self):
+        if not self.balance_shards:
+            return self.balance
+        return self.balance + (self.shards.aggregate(total=models.Sum('balance'))['total'] or 0)
+
+
+class BalanceShard(models.Model):
+    bank_account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, related_name='shards')
+    shard = models.PositiveSmallIntegerField()
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bank_account', 'shard'], name='balance_shard_account_shard'),
+        ]
+
+    def __str__(self):
+        return f"{self.bank_account_id} - {self.shard}"
 
 class DebitCard(models.Model):
     card_number = models.CharField(max_length=16, unique=True)
@@ -32,6 +63,32 @@ class DebitCardRequest(models.Model):
 
 def generate_unique_transaction_id():
     return str(uuid.uuid4().hex)
+
+
+class Transfer(models.Model):
+    # Journal entry for one movement between two accounts; its debit and credit
+    # Transaction legs point back here through the reference
+    reference = models.CharField(max_length=32, unique=True, default=generate_unique_transaction_id)
+    debit_account = models.ForeignKey('BankAccount', on_delete=models.SET_NULL, null=True,
+                                      related_name='outgoing_transfers')
+    credit_account = models.ForeignKey('BankAccount', on_delete=models.SET_NULL, null=True,
+                                       related_name='incoming_transfers')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3)
+    # Credit account currency units per debit account currency unit, as applied
+    rate = models.DecimalField(max_digits=18, decimal_places=8, default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['debit_account', 'credit_account', 'created_at'], name='transfer_debit_credit'),
+            models.Index(fields=['credit_account', 'created_at'], name='transfer_credit_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.reference} - {self.amount} {self.currency}"
+
+
 class Transaction(models.Model):
     TRANSACTION_TYPES = (
         ('DEBIT', 'Debit'),
@@ -44,6 +101,131 @@ class Transaction(models.Model):
     currency = models.CharField(max_length=3)
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPES)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Keyed by reference rather than id so legs can be bulk-inserted alongside their
+    # transfer on backends where bulk_create does not return primary keys
+    transfer = models.ForeignKey(Transfer, to_field='reference', on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='legs')
+
+    class Meta:
+        indexes = [
+            # Covers statement aggregates as well as history ordering, so both are index-only reads
+            models.Index(fields=['bank_account', 'created_at', 'transaction_type', 'amount'],
+                         name='transaction_account_created'),
+            models.Index(fields=['created_at'], name='transaction_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_id} - {self.transaction_type}"
+
+
+class ArchivedTransaction(models.Model):
+    # Transactions from closed months, moved out of the hot table by the
+    # archive_transactions command with their original ids. On MySQL the table is
+    # compressed and range-partitioned by month, which rules out foreign key
+    # constraints and makes the primary key (id, created_at) there.
+    id = models.BigIntegerField(primary_key=True)
+    transaction_id = models.CharField(max_length=255, db_index=True)
+    bank_account = models.ForeignKey('BankAccount', on_delete=models.CASCADE, db_constraint=False,
+                                     related_name='archived_transactions')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    currency = models.CharField(max_length=3)
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPES)
+    created_at = models.DateTimeField()
+    transfer = models.ForeignKey(Transfer, to_field='reference', on_delete=models.SET_NULL, null=True, blank=True,
+                                 db_constraint=False, related_name='archived_legs')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bank_account', 'created_at', 'transaction_type', 'amount'],
+                         name='archived_account_created'),
+            models.Index(fields=['created_at'], name='archived_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_id} - {self.transaction_type}"
+
+
+class ArchivedPeriod(models.Model):
+    # One row per archived month; everything before the latest month's end lives
+    # in ArchivedTransaction
+    month = models.DateField(unique=True)
+    transaction_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} - {self.transaction_count}"
+
+class DailyBalance(models.Model):
+    bank_account = models.ForeignKey('BankAccount', on_delete=models.CASCADE, related_name='daily_balances')
+    date = models.DateField()
+    credits = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    debits = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    transaction_count = models.PositiveIntegerField(default=0)
+    closing_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bank_account', 'date'], name='daily_balance_account_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.bank_account_id} - {self.date}"
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_key_user_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key}"
+
+
+class ExchangeRate(models.Model):
+    # Units of this currency per one unit of settings.FX_BASE_CURRENCY, which is
+    # implicitly 1 and needs no row
+    currency = models.CharField(max_length=3, unique=True)
+    rate = models.DecimalField(max_digits=18, decimal_places=8)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.currency} - {self.rate}"
+
+
+class IdentifierSequence(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name} - {self.next_value}"
+
+
+class BackgroundTask(models.Model):
+    # Work queued for the run_task_worker command. Rows are deleted once the task
+    # succeeds; locked_until leases a row to one worker while it runs, and
+    # failed_at marks tasks that used up their retries.
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    failed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['failed_at', 'run_after'], name='background_task_due'),
+        ]
 
     def __str__(self):
-        return f"{self.transaction_id} - {self.transaction_type}"
\ No newline at end of file
+        return f"{self.name} - {self.attempts}"
@@ -0,0 +1,154 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .models import CustomUser
+
+IMPORT_FIELDS = ('username', 'password', 'email', 'first_name', 'last_name')
+username_validator = UnicodeUsernameValidator()
+
+
+def _init_worker(settings_module):
+    # Spawned workers (macOS, Windows) start without Django configured
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def _hash_password(password):
+    return make_password(password)
+
+
+class MalformedRow:
+    # Stands in for an NDJSON line that does not parse, so it is reported like any
+    # other invalid row instead of stopping an import whose earlier chunks committed
+    def __init__(self, reason):
+        self.reason = reason
+
+
+def read_rows(path, file_format=None):
+    # Yields one dict per client without loading the whole file, except for a
+    # plain JSON array, which has to be parsed in one go
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, newline='', encoding='utf-8') as handle:
+        if file_format == 'csv':
+            yield from csv.DictReader(handle)
+        elif file_format in ('ndjson', 'jsonl'):
+            for line_number, line in enumerate(handle, start=1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        yield MalformedRow(f'Invalid JSON on line {line_number}: {exc.msg}.')
+        elif file_format == 'json':
+            yield from json.load(handle)
+        else:
+            raise ValueError(f'Unsupported import format: {file_format}')
+
+
+def validate_row(row):
+    if isinstance(row, MalformedRow):
+        return None, row.reason
+    if not isinstance(row, dict):
+        return None, 'Row must be an object.'
+    for field in IMPORT_FIELDS:
+        if row.get(field) is not None and not isinstance(row[field], str):
+            return None, f'{field.capitalize().replace("_", " ")} must be a string.'
+    client = {field: (row.get(field) or '').strip() for field in IMPORT_FIELDS}
+    if not client['username']:
+        return None, 'Username is required.'
+    if len(client['username']) > 150:
+        return None, 'Username must be at most 150 characters.'
+    if not client['password']:
+        return None, 'Password field is required.'
+    try:
+        username_validator(client['username'])
+        if client['email']:
+            validate_email(client['email'])
+    except ValidationError as exc:
+        return None, ' '.join(exc.messages)
+    return client, None
+
+
+class ClientImporter:
+    # Validates a chunk, hashes its passwords across the process pool, then inserts
+    # it with one bulk_create. Rejected rows are collected with their record number.
+
+    def __init__(self, workers=None, chunk_size=1000):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.rejected = []
+
+    def run(self, rows):
+        settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'banking_project1.settings')
+        seen = set()
+        numbered = enumerate(rows, start=1)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(settings_module,)) as pool:
+            while True:
+                chunk = list(islice(numbered, self.chunk_size))
+                if not chunk:
+                    break
+                self._import_chunk(chunk, seen, pool)
+        self.rejected.sort(key=lambda row: row['row'])
+        return self.created, self.rejected
+
+    def _reject(self, row_number, row, reason):
+        username = row.get('username') if isinstance(row, dict) else None
+        self.rejected.append({'row': row_number, 'username': username, 'reason': reason})
+
+    def _import_chunk(self, chunk, seen, pool):
+        valid = []
+        for row_number, row in chunk:
+            client, error = validate_row(row)
+            if error:
+                self._reject(row_number, row, error)
+            elif client['username'] in seen:
+                self._reject(row_number, row, 'Duplicate username in import file.')
+            else:
+                seen.add(client['username'])
+                valid.append((row_number, client))
+
+        existing = set(CustomUser.objects.filter(
+            username__in=[client['username'] for _, client in valid]
+        ).values_list('username', flat=True))
+        accepted = []
+        for row_number, client in valid:
+            if client['username'] in existing:
+                self._reject(row_number, client, 'A user with that username already exists.')
+            else:
+                accepted.append((row_number, client))
+        if not accepted:
+            return
+
+        chunksize = max(1, len(accepted) // (self.workers * 4))
+        hashes = pool.map(_hash_password, [client['password'] for _, client in accepted], chunksize=chunksize)
+        users = [
+            CustomUser(username=client['username'], password=hashed, email=client['email'],
+                       first_name=client['first_name'], last_name=client['last_name'], is_client=True)
+            for (_, client), hashed in zip(accepted, hashes)
+        ]
+        try:
+            with transaction.atomic():
+                CustomUser.objects.bulk_create(users)
+        except IntegrityError:
+            # Someone created one of these usernames meanwhile; insert the rest one by one
+            for (row_number, client), user in zip(accepted, users):
+                try:
+                    with transaction.atomic():
+                        user.save()
+                except IntegrityError:
+                    self._reject(row_number, client, 'A user with that username already exists.')
+                else:
+                    self.created += 1
+            return
+        self.created += len(users)
@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TransactionCursorPagination(CursorPagination):
+    # Keyset pagination on (created_at, id): every page is a range read on the
+    # (bank_account, created_at) index, however deep the client scrolls
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
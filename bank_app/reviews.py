@@ -0,0 +1,150 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+
+from . import eligibility
+from .identifiers import calculate_expiration_date, generate_card_numbers
+from .models import BankAccount, DebitCard, DebitCardRequest
+
+MAX_BULK_REVIEW = 1000
+DECISION_BATCH_SIZE = 1000
+MIN_DEBIT_CARD_SALARY = Decimal('500')
+
+# Automatic rejections, checked in order over each batch of pending request rows
+DEBIT_CARD_REJECTION_RULES = [
+    (lambda row: row.monthly_salary < MIN_DEBIT_CARD_SALARY,
+     f'Monthly salary is below {MIN_DEBIT_CARD_SALARY} euros.'),
+    (lambda row: row.has_card, 'A debit card is already connected to this account.'),
+]
+
+
+def _error(pk, detail):
+    return {'id': pk, 'status': 'error', 'detail': detail}
+
+
+def review_bank_accounts(ids, is_approved):
+    # One locked read, one bulk_update; unknown ids are reported per item
+    with transaction.atomic():
+        accounts = {account.pk: account for account in BankAccount.objects.select_for_update().filter(pk__in=ids)}
+        for account in accounts.values():
+            account.is_approved = is_approved
+        BankAccount.objects.bulk_update(accounts.values(), ['is_approved'])
+        transaction.on_commit(lambda: eligibility.invalidate_many(accounts.values()))
+
+    outcome = 'approved' if is_approved else 'rejected'
+    return [
+        {'id': pk, 'status': outcome} if pk in accounts else _error(pk, 'Bank account not found.')
+        for pk in ids
+    ]
+
+
+def review_debit_card_requests(decisions):
+    # decisions is a list of (request_id, is_approved, rejection_reason). Every
+    # request, account and existing card is loaded up front; approvals become one
+    # DebitCard bulk_create and all decisions one DebitCardRequest bulk_update.
+    ids = [pk for pk, _, _ in decisions]
+    with transaction.atomic():
+        requests = {
+            request.pk: request
+            for request in DebitCardRequest.objects.select_for_update().filter(pk__in=ids)
+        }
+        accounts = {
+            account.user_id: account
+            for account in BankAccount.objects.filter(user_id__in={request.client_id for request in requests.values()})
+        }
+        carded = set(DebitCard.objects.filter(
+            connected_account__in=list(accounts.values())
+        ).values_list('connected_account_id', flat=True))
+
+        results = []
+        changed = []
+        cards = []
+        for pk, is_approved, rejection_reason in decisions:
+            request = requests.get(pk)
+            if request is None:
+                results.append(_error(pk, 'Debit card request not found.'))
+                continue
+            if request.is_approved or request.rejection_reason:
+                results.append(_error(pk, 'Debit card request has already been reviewed.'))
+                continue
+
+            if not is_approved:
+                if not rejection_reason:
+                    results.append(_error(pk, 'A rejection reason is required.'))
+                    continue
+                request.rejection_reason = rejection_reason
+                changed.append(request)
+                results.append({'id': pk, 'status': 'rejected'})
+                continue
+
+            account = accounts.get(request.client_id)
+            if account is None:
+                results.append(_error(pk, 'The client does not have a bank account.'))
+                continue
+            if account.pk in carded:
+                results.append(_error(pk, 'A debit card is already connected to this account.'))
+                continue
+
+            carded.add(account.pk)
+            request.is_approved = True
+            request.rejection_reason = None
+            changed.append(request)
+            cards.append(DebitCard(
+                expiration_date=calculate_expiration_date(),
+                connected_account=account,
+                is_approved=True,
+            ))
+            results.append({'id': pk, 'status': 'approved'})
+
+        # Card numbers for the whole batch come from a single allocation
+        for card, card_number in zip(cards, generate_card_numbers(len(cards))):
+            card.card_number = card_number
+        DebitCardRequest.objects.bulk_update(changed, ['is_approved', 'rejection_reason'])
+        DebitCard.objects.bulk_create(cards)
+        carded_accounts = [card.connected_account for card in cards]
+        transaction.on_commit(lambda: eligibility.invalidate_many(carded_accounts))
+
+    return results
+
+
+def pending_debit_card_requests():
+    return DebitCardRequest.objects.filter(is_approved=False, rejection_reason__isnull=True)
+
+
+def decide_debit_card_requests(batch_size=DECISION_BATCH_SIZE):
+    # Runs the rules over every pending request, one batch of rows at a time: a
+    # single query per batch brings each request's account state along, and the
+    # decisions are written through review_debit_card_requests. Requests whose
+    # client has no approved bank account yet stay pending for a banker.
+    has_card = DebitCard.objects.filter(connected_account__user_id=OuterRef('client_id'))
+    pending = pending_debit_card_requests().annotate(
+        account_approved=F('client__bank_account__is_approved'),
+        has_card=Exists(has_card),
+    ).order_by('pk')
+
+    outcome = Counter()
+    last_pk = 0
+    while True:
+        rows = list(pending.filter(pk__gt=last_pk).values_list(
+            'id', 'monthly_salary', 'account_approved', 'has_card', named=True)[:batch_size])
+        if not rows:
+            break
+        last_pk = rows[-1].id
+
+        reasons = [None] * len(rows)
+        for rule, reason in DEBIT_CARD_REJECTION_RULES:
+            reasons = [current or (reason if rule(row) else None) for row, current in zip(rows, reasons)]
+
+        decisions = []
+        for row, reason in zip(rows, reasons):
+            if reason:
+                decisions.append((row.id, False, reason))
+            elif row.account_approved:
+                decisions.append((row.id, True, None))
+            else:
+                outcome['pending'] += 1
+        if decisions:
+            outcome.update(result['status'] for result in review_debit_card_requests(decisions))
+    return outcome
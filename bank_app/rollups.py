@@ -0,0 +1,125 @@
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .archive import history_querysets
+from .models import BankAccount, DailyBalance
+
+ZERO = Decimal('0.00')
+
+
+class Movements:
+    # Collects per-account credits and debits for one unit of work so each
+    # touched account costs a single rollup write. Sharded accounts are left out:
+    # a per-day rollup row would serialize their credits again, so compaction
+    # rebuilds their rollups instead.
+    def __init__(self):
+        self._totals = defaultdict(lambda: [ZERO, ZERO, 0])
+
+    def credit(self, account, amount):
+        if not account.balance_shards:
+            totals = self._totals[account.pk]
+            totals[0] += amount
+            totals[2] += 1
+
+    def debit(self, account, amount):
+        if not account.balance_shards:
+            totals = self._totals[account.pk]
+            totals[1] += amount
+            totals[2] += 1
+
+    def items(self):
+        return self._totals.items()
+
+
+def record_movements(movements, day=None):
+    # Must run inside the transaction that changed the balances: the account row
+    # locks taken there serialize concurrent writers to the same rollup row
+    day = day or timezone.localdate()
+    for account_id, (credits, debits, count) in movements.items():
+        updated = DailyBalance.objects.filter(bank_account_id=account_id, date=day).update(
+            credits=F('credits') + credits,
+            debits=F('debits') + debits,
+            transaction_count=F('transaction_count') + count,
+            closing_balance=F('closing_balance') + credits - debits,
+        )
+        if not updated:
+            balance = BankAccount.objects.filter(pk=account_id).values_list('balance', flat=True).get()
+            DailyBalance.objects.create(
+                bank_account_id=account_id,
+                date=day,
+                credits=credits,
+                debits=debits,
+                transaction_count=count,
+                closing_balance=balance,
+            )
+
+
+@transaction.atomic
+def rebuild_daily_balances(batch_size=1000, account_ids=None, since=None):
+    # Recompute rollup rows from the transaction log, optionally only for some
+    # accounts and from a given day on; closing balances are derived backwards
+    # from each account's current visible balance
+    rollups = DailyBalance.objects.all()
+    accounts = BankAccount.objects.all()
+    filters = {}
+    if account_ids is not None:
+        filters['bank_account_id__in'] = account_ids
+        rollups = rollups.filter(bank_account_id__in=account_ids)
+        accounts = accounts.filter(pk__in=account_ids)
+    if since is not None:
+        rollups = rollups.filter(date__gte=since)
+    start = timezone.make_aware(datetime.combine(since, time.min)) if since is not None else None
+
+    def daily(transactions):
+        return (
+            transactions
+            .annotate(date=TruncDate('created_at'))
+            .values('bank_account_id', 'date')
+            .annotate(
+                credits=Sum('amount', filter=Q(transaction_type='CREDIT'), default=ZERO),
+                debits=Sum('amount', filter=Q(transaction_type='DEBIT'), default=ZERO),
+                transaction_count=Count('id'),
+            )
+            .order_by('bank_account_id', '-date')
+        )
+
+    # Newest storage first, since closing balances are walked backwards from today;
+    # archived days all precede hot ones
+    entries = chain.from_iterable(
+        daily(source).iterator() for source in reversed(history_querysets(start, **filters))
+    )
+
+    balances = dict(accounts.values_list('id', 'balance'))
+    pending = accounts.filter(balance_shards__gt=0).values('id').annotate(total=Sum('shards__balance'))
+    for entry in pending:
+        balances[entry['id']] += entry['total'] or ZERO
+
+    rollups.delete()
+    rows = []
+    running = {}
+    created = 0
+    for entry in entries:
+        account_id = entry['bank_account_id']
+        closing = running.get(account_id, balances.get(account_id, ZERO))
+        rows.append(DailyBalance(
+            bank_account_id=account_id,
+            date=entry['date'],
+            credits=entry['credits'],
+            debits=entry['debits'],
+            transaction_count=entry['transaction_count'],
+            closing_balance=closing,
+        ))
+        running[account_id] = closing - entry['credits'] + entry['debits']
+        if len(rows) >= batch_size:
+            DailyBalance.objects.bulk_create(rows)
+            created += len(rows)
+            rows = []
+    DailyBalance.objects.bulk_create(rows)
+    return created + len(rows)
@@ -0,0 +1,109 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+STICKY_KEY_PREFIX = 'db-sticky'
+
+_request_state = ContextVar('db_routing', default=None)
+
+
+class _RoutingState:
+    def __init__(self):
+        self.replica_reads = False
+        self.wrote = False
+
+
+@contextmanager
+def routing_scope():
+    state = _RoutingState()
+    token = _request_state.set(state)
+    try:
+        yield state
+    finally:
+        _request_state.reset(token)
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def _sticky_key(user_id):
+    return f'{STICKY_KEY_PREFIX}:{user_id}'
+
+
+def mark_sticky(user_id):
+    cache.set(_sticky_key(user_id), True, getattr(settings, 'REPLICA_STICKY_SECONDS', 5))
+
+
+def is_sticky(user_id):
+    return cache.get(_sticky_key(user_id)) is not None
+
+
+def allow_replica_reads():
+    state = _request_state.get()
+    if state is not None:
+        state.replica_reads = True
+
+
+def read_database():
+    # The replica only serves requests that opted in, and only until they write;
+    # reads inside a transaction must see its own writes
+    state = _request_state.get()
+    alias = replica_alias()
+    if alias is None or state is None or not state.replica_reads or state.wrote:
+        return DEFAULT_DB_ALIAS
+    if transaction.get_connection(DEFAULT_DB_ALIAS).in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+class PrimaryReplicaRouter:
+    # Writes always go to the primary; reads go to the replica alias when the
+    # current request allows it (see ReplicaReadMixin)
+
+    def db_for_read(self, model, **hints):
+        return read_database()
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    # Scopes routing state to the request, and keeps a user on the primary for
+    # REPLICA_STICKY_SECONDS after any request of theirs that wrote, so they read
+    # their own writes however far the replica lags
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routing_scope() as state:
+            response = self.get_response(request)
+
+        # DRF copies the authenticated user back onto the Django request
+        user = getattr(request, 'user', None)
+        if state.wrote and user is not None and user.is_authenticated:
+            mark_sticky(user.pk)
+        return response
+
+
+class ReplicaReadMixin:
+    # For read-only API views: safe-method requests read from the replica unless
+    # the user is still sticky to the primary
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD', 'OPTIONS') and replica_alias() is not None \
+                and not (request.user.is_authenticated and is_sticky(request.user.pk)):
+            allow_replica_reads()
@@ -1,36 +1,124 @@
+from decimal import Decimal
 from rest_framework import serializers
+from . import fx, metrics
 from .models import CustomUser
-from .models import BankAccount, DebitCard, DebitCardRequest, Transaction
+from .models import BankAccount, DebitCard, DebitCardRequest, Transaction, Transfer
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with metrics.timer('serializer'):
+            return super().data
+
+
+class TimedSerializerMixin:
+    # Reports time spent building response data to the metrics middleware
+    @property
+    def data(self):
+        with metrics.timer('serializer'):
+            return super().data
+
+
+class CustomUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ['id', 'username', 'email', 'is_client', 'password']
+        list_serializer_class = TimedListSerializer
 
 
-class BankAccountRequestSerializer(serializers.ModelSerializer):
+class BankAccountRequestSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = BankAccount
         fields = ['account_id', 'iban', 'currency']
         read_only_fields = ['account_id', 'iban']
 
-class BankAccountSerializer(serializers.ModelSerializer):
+    def validate_currency(self, value):
+        if not fx.is_supported(value):
+            raise serializers.ValidationError("Unsupported currency.")
+        return value
+
+class BankAccountSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = BankAccount
         fields = '__all__'
+        list_serializer_class = TimedListSerializer
+        read_only_fields = ['balance_shards']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Sharded accounts show their main balance plus credits not yet compacted
+        if instance.balance_shards:
+            data['balance'] = self.fields['balance'].to_representation(instance.get_visible_balance())
+        return data
 
-class DebitCardSerializer(serializers.ModelSerializer):
+class DebitCardSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = DebitCard
         fields = '__all__'
+        list_serializer_class = TimedListSerializer
 
-class DebitCardRequestSerializer(serializers.ModelSerializer):
+class DebitCardRequestSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = DebitCardRequest
         fields = ['id', 'monthly_salary', 'is_approved', 'rejection_reason', 'created_at']
+        list_serializer_class = TimedListSerializer
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = ['bank_account', 'amount', 'currency', 'transaction_type', 'created_at']
+        list_serializer_class = TimedListSerializer
         read_only_fields = ['transaction_id', 'created_at']
+
+class StatementLineSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    # Lines are shown in the statement currency, which may differ from the account's
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, source='statement_amount', read_only=True)
+    currency = serializers.CharField(source='statement_currency', read_only=True)
+    running_balance = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Transaction
+        fields = ['transaction_id', 'amount', 'currency', 'transaction_type', 'created_at', 'running_balance']
+        list_serializer_class = TimedListSerializer
+
+class TransferSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    debit_iban = serializers.CharField(source='debit_account.iban', default=None, read_only=True)
+    credit_iban = serializers.CharField(source='credit_account.iban', default=None, read_only=True)
+
+    class Meta:
+        model = Transfer
+        fields = ['reference', 'debit_iban', 'credit_iban', 'amount', 'currency', 'created_at']
+        list_serializer_class = TimedListSerializer
+
+
+class ClientOverviewAccountSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BankAccount
+        fields = ['account_id', 'iban', 'currency', 'balance', 'is_approved']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Shards come prefetched, so the visible balance costs no extra query per account
+        if instance.balance_shards:
+            shard_total = sum((shard.balance for shard in instance.shards.all()), Decimal('0'))
+            data['balance'] = self.fields['balance'].to_representation(instance.balance + shard_total)
+        return data
+
+
+class ClientOverviewDebitCardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DebitCard
+        fields = ['id', 'expiration_date', 'is_approved']
+
+
+class ClientOverviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    bank_account = ClientOverviewAccountSerializer(read_only=True)
+    debit_card = ClientOverviewDebitCardSerializer(source='bank_account.debitcard', read_only=True)
+    pending_card_requests = serializers.IntegerField(read_only=True)
+    last_transaction_at = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'username', 'email', 'bank_account', 'debit_card', 'pending_card_requests',
+                  'last_transaction_at']
+        list_serializer_class = TimedListSerializer
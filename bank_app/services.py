@@ -0,0 +1,246 @@
+import time
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+
+from django.db import OperationalError, transaction
+from django.db.models import Case, DecimalField, F, Value, When
+
+from . import fx, velocity
+from .models import BankAccount, Transaction, Transfer
+from .rollups import Movements, record_movements
+from .shards import credit_shard
+
+# MySQL error codes for "deadlock found" and "lock wait timeout exceeded"
+RETRYABLE_DB_ERRORS = (1213, 1205)
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.05
+
+
+class TransferError(Exception):
+    pass
+
+
+class InvalidAmount(TransferError):
+    pass
+
+
+class InsufficientBalance(TransferError):
+    pass
+
+
+class UnsupportedCurrency(TransferError):
+    pass
+
+
+class VelocityLimitExceeded(TransferError):
+    pass
+
+
+def parse_amount(amount):
+    # Amounts arrive as strings or numbers from request.data, never go through float
+    try:
+        value = Decimal(str(amount)).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        raise InvalidAmount("Amount must be a valid number.")
+    if not value.is_finite() or value <= 0:
+        raise InvalidAmount("Amount must be a positive number.")
+    return value
+
+
+def _conversion(sender_account, receiver_account, amount):
+    # Rates come from the in-process cache; returns (rate, amount credited)
+    try:
+        rate = fx.rate(sender_account.currency, receiver_account.currency)
+    except fx.UnknownCurrency as exc:
+        raise UnsupportedCurrency(str(exc))
+    credit_amount = fx.convert(amount, rate)
+    if credit_amount <= 0:
+        raise InvalidAmount("Amount is too small to convert to the receiver's currency.")
+    return rate, credit_amount
+
+
+@contextmanager
+def _velocity_limited(account, kind, amount, count=1):
+    # Counters live in the cache, so the check never scans Transaction; the
+    # reservation is given back if the movement fails
+    try:
+        reservation = velocity.reserve(account.pk, kind, amount, count)
+    except velocity.LimitExceeded as exc:
+        raise VelocityLimitExceeded(str(exc))
+    try:
+        yield
+    except BaseException:
+        reservation.release()
+        raise
+
+
+def _is_retryable(exc):
+    code = exc.args[0] if exc.args else None
+    return code in RETRYABLE_DB_ERRORS or 'database is locked' in str(exc)
+
+
+def run_with_retry(func, *args, **kwargs):
+    # Re-run the whole atomic unit when the database picks us as a deadlock victim
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except OperationalError as exc:
+            if attempt == MAX_RETRIES or not _is_retryable(exc):
+                raise
+            time.sleep(RETRY_BACKOFF * (2 ** attempt))
+
+
+def _debit(account, amount):
+    # Conditional update: the balance check and the write happen in one statement
+    updated = BankAccount.objects.filter(pk=account.pk, balance__gte=amount).update(
+        balance=F('balance') - amount
+    )
+    if not updated:
+        raise InsufficientBalance("Insufficient balance in the sender's account.")
+
+
+def _credit(account, amount):
+    if account.balance_shards:
+        credit_shard(account, amount)
+        return
+    BankAccount.objects.filter(pk=account.pk).update(balance=F('balance') + amount)
+
+
+def _journal_entry(sender_account, receiver_account, amount, rate):
+    return Transfer(debit_account=sender_account, credit_account=receiver_account, amount=amount,
+                    currency=sender_account.currency, rate=rate)
+
+
+def _journal_legs(sender_account, receiver_account, amount, credit_amount, entry):
+    # Each leg is booked in its own account's currency
+    return [
+        Transaction(bank_account=sender_account, amount=amount, currency=sender_account.currency,
+                    transaction_type="DEBIT", transfer_id=entry.reference),
+        Transaction(bank_account=receiver_account, amount=credit_amount, currency=receiver_account.currency,
+                    transaction_type="CREDIT", transfer_id=entry.reference),
+    ]
+
+
+def _apply_transfer(sender_account, receiver_account, amount, rate, credit_amount):
+    # Always touch rows in primary key order so concurrent transfers between the
+    # same two accounts cannot lock each other in opposite order. Shard rows are
+    # always locked after account rows.
+    if sender_account.pk <= receiver_account.pk or receiver_account.balance_shards:
+        _debit(sender_account, amount)
+        _credit(receiver_account, credit_amount)
+    else:
+        _credit(receiver_account, credit_amount)
+        _debit(sender_account, amount)
+
+    entry = _journal_entry(sender_account, receiver_account, amount, rate)
+    Transfer.objects.bulk_create([entry])
+    Transaction.objects.bulk_create(_journal_legs(sender_account, receiver_account, amount, credit_amount, entry))
+
+    movements = Movements()
+    movements.debit(sender_account, amount)
+    movements.credit(receiver_account, credit_amount)
+    record_movements(movements)
+
+
+def _credit_many(credits):
+    # One UPDATE for any number of receivers, each getting its own increment
+    if not credits:
+        return
+    increment = Case(
+        *[When(pk=pk, then=Value(amount)) for pk, amount in credits.items()],
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    BankAccount.objects.filter(pk__in=list(credits)).update(balance=F('balance') + increment)
+
+
+def _apply_batch_transfer(sender_account, legs):
+    # legs are (receiver_account, amount, rate, credit_amount)
+    total = sum((amount for _, amount, _, _ in legs), Decimal('0'))
+    credits = {}
+    sharded = []
+    for receiver_account, _, _, credit_amount in legs:
+        if receiver_account.balance_shards:
+            sharded.append((receiver_account, credit_amount))
+        else:
+            credits[receiver_account.pk] = credits.get(receiver_account.pk, Decimal('0')) + credit_amount
+
+    # Keep the same primary key lock order as single transfers
+    lower = {pk: amount for pk, amount in credits.items() if pk < sender_account.pk}
+    higher = {pk: amount for pk, amount in credits.items() if pk > sender_account.pk}
+    _credit_many(lower)
+    _debit(sender_account, total)
+    _credit_many(higher)
+    for receiver_account, amount in sharded:
+        credit_shard(receiver_account, amount)
+
+    entries = []
+    rows = []
+    movements = Movements()
+    for receiver_account, amount, rate, credit_amount in legs:
+        entry = _journal_entry(sender_account, receiver_account, amount, rate)
+        entries.append(entry)
+        rows.extend(_journal_legs(sender_account, receiver_account, amount, credit_amount, entry))
+        movements.debit(sender_account, amount)
+        movements.credit(receiver_account, credit_amount)
+    Transfer.objects.bulk_create(entries)
+    Transaction.objects.bulk_create(rows)
+    record_movements(movements)
+    return total
+
+
+def _apply_withdrawal(account, amount):
+    _debit(account, amount)
+    Transaction.objects.create(bank_account=account, amount=amount, currency=account.currency,
+                               transaction_type="DEBIT")
+
+    movements = Movements()
+    movements.debit(account, amount)
+    record_movements(movements)
+
+
+def _apply_deposit(account, amount):
+    _credit(account, amount)
+    Transaction.objects.create(bank_account=account, amount=amount, currency=account.currency,
+                               transaction_type="CREDIT")
+
+    movements = Movements()
+    movements.credit(account, amount)
+    record_movements(movements)
+
+
+def transfer(sender_account, receiver_account, amount):
+    # amount is in the sender's currency; the receiver is credited in theirs
+    amount = parse_amount(amount)
+    if sender_account.pk == receiver_account.pk:
+        raise TransferError("Sender and receiver accounts must be different.")
+    rate, credit_amount = _conversion(sender_account, receiver_account, amount)
+    with _velocity_limited(sender_account, 'transfer', amount):
+        run_with_retry(_apply_transfer, sender_account, receiver_account, amount, rate, credit_amount)
+    return amount
+
+
+def batch_transfer(sender_account, legs):
+    # legs is a list of (receiver_account, amount) pairs with amounts already parsed
+    if any(receiver_account.pk == sender_account.pk for receiver_account, _ in legs):
+        raise TransferError("Sender and receiver accounts must be different.")
+    legs = [
+        (receiver_account, amount, *_conversion(sender_account, receiver_account, amount))
+        for receiver_account, amount in legs
+    ]
+    total = sum((amount for _, amount, _, _ in legs), Decimal('0'))
+    with _velocity_limited(sender_account, 'transfer', total, count=len(legs)):
+        return run_with_retry(_apply_batch_transfer, sender_account, legs)
+
+
+def withdraw(account, amount):
+    amount = parse_amount(amount)
+    with _velocity_limited(account, 'withdrawal', amount):
+        run_with_retry(_apply_withdrawal, account, amount)
+    return amount
+
+
+def deposit(account, amount):
+    amount = parse_amount(amount)
+    run_with_retry(_apply_deposit, account, amount)
+    return amount
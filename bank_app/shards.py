@@ -0,0 +1,62 @@
+import random
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import BalanceShard, BankAccount
+
+# Credits to a sharded account land on one of its BalanceShard rows chosen at random,
+# so concurrent payers lock different rows instead of queueing on the account row.
+# Debits still run against BankAccount.balance only: shard credits become spendable
+# once compaction folds them into the main row.
+
+
+def credit_shard(account, amount):
+    # account.balance_shards may come from the eligibility cache and configure() may
+    # run concurrently, so the count is re-read here; a credit that finds no shard
+    # row lands on the account row instead of being lost
+    shards = BankAccount.objects.filter(pk=account.pk).values_list('balance_shards', flat=True).first() or 0
+    if shards and BalanceShard.objects.filter(
+        bank_account_id=account.pk, shard=random.randrange(shards)
+    ).update(balance=F('balance') + amount):
+        account.balance_shards = shards
+        return
+    BankAccount.objects.filter(pk=account.pk).update(balance=F('balance') + amount)
+    # Credited like an unsharded account, so the incremental rollup must count it
+    account.balance_shards = 0
+
+
+@transaction.atomic
+def compact(account):
+    # Lock order matches the transfer path: account row first, then its shards
+    account = BankAccount.objects.select_for_update().get(pk=account.pk)
+    shards = BalanceShard.objects.select_for_update().filter(bank_account=account)
+    pending = shards.aggregate(total=Sum('balance'))['total'] or 0
+    if pending:
+        BankAccount.objects.filter(pk=account.pk).update(balance=F('balance') + pending)
+        shards.update(balance=0)
+    return pending
+
+
+def compact_all():
+    from .rollups import rebuild_daily_balances
+
+    compacted = {}
+    since = timezone.localdate() - timedelta(days=1)
+    for account in BankAccount.objects.filter(balance_shards__gt=0):
+        compacted[account.iban] = compact(account)
+        # Credits to sharded accounts skip the incremental rollup; catch it up here
+        rebuild_daily_balances(account_ids=[account.pk], since=since)
+    return compacted
+
+
+@transaction.atomic
+def configure(account, shards):
+    # Changing the shard count folds pending credits back first, then recreates the rows
+    compact(account)
+    BalanceShard.objects.filter(bank_account=account).delete()
+    BalanceShard.objects.bulk_create([BalanceShard(bank_account=account, shard=index) for index in range(shards)])
+    account.balance_shards = shards
+    account.save(update_fields=['balance_shards'])
@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import eligibility, fx
+from .models import BankAccount, DebitCard, ExchangeRate
+
+
+@receiver(post_save, sender=BankAccount)
+@receiver(post_delete, sender=BankAccount)
+def invalidate_account_eligibility(sender, instance, **kwargs):
+    # After commit: dropped earlier, a concurrent reader could re-cache the old row
+    # for the full TTL. Keys loaded as deferred are not known and not dropped.
+    keys = [(instance.user_id, instance.iban)]
+    previous = getattr(instance, '_loaded_keys', None)
+    if previous and previous != keys[0] and DEFERRED not in previous:
+        keys.append(previous)
+    instance._loaded_keys = keys[0]
+
+    def invalidate():
+        for user_id, iban in keys:
+            eligibility.invalidate(user_id, iban)
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=DebitCard)
+@receiver(post_delete, sender=DebitCard)
+def invalidate_card_eligibility(sender, instance, **kwargs):
+    account_id = instance.connected_account_id
+    transaction.on_commit(lambda: eligibility.invalidate_accounts([account_id]))
+
+
+@receiver(post_save, sender=ExchangeRate)
+@receiver(post_delete, sender=ExchangeRate)
+def bump_exchange_rate_version(sender, instance, **kwargs):
+    transaction.on_commit(fx.bump_version)
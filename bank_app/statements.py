@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+from django.db.models import Case, CharField, Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When, Window
+
+from . import fx
+
+from .archive import TransactionHistory, history_querysets
+
+ZERO = Decimal('0.00')
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+RATE = DecimalField(max_digits=18, decimal_places=8)
+
+# Credits add to the balance, debits subtract from it
+SIGNED_AMOUNT = Case(
+    When(transaction_type='DEBIT', then=-F('amount')),
+    default=F('amount'),
+    output_field=MONEY,
+)
+
+
+def _money(value):
+    # Some backends drop the scale on SUM(); present every figure with two decimals
+    return Decimal(value).quantize(ZERO)
+
+
+def _scaled(expression, rate):
+    # One rate for the whole statement, applied by the database across all rows
+    if rate == 1:
+        return expression
+    return ExpressionWrapper(expression * Value(rate, output_field=RATE), output_field=MONEY)
+
+
+def build_statement(account, start=None, end=None, currency=None):
+    # Figures are in the account currency unless another currency is requested;
+    # raises fx.UnknownCurrency when there is no rate for it
+    currency = currency or account.currency
+    rate = fx.rate(account.currency, currency)
+
+    in_period = Q()
+    if start:
+        in_period &= Q(created_at__gte=start)
+    if end:
+        in_period &= Q(created_at__lt=end)
+
+    # Everything booked since the period started, oldest storage first; the
+    # archive only takes part when the period reaches back into it
+    sources = history_querysets(start, bank_account=account)
+
+    # Opening balance is the current balance minus everything booked since the
+    # period started; all figures come from one pass over each table's index range
+    totals = [
+        source.aggregate(
+            net_since_start=Sum(SIGNED_AMOUNT, default=ZERO),
+            net_in_period=Sum(SIGNED_AMOUNT, filter=in_period, default=ZERO),
+            credit_total=Sum('amount', filter=in_period & Q(transaction_type='CREDIT'), default=ZERO),
+            credit_count=Count('id', filter=in_period & Q(transaction_type='CREDIT')),
+            debit_total=Sum('amount', filter=in_period & Q(transaction_type='DEBIT'), default=ZERO),
+            debit_count=Count('id', filter=in_period & Q(transaction_type='DEBIT')),
+        )
+        for source in sources
+    ]
+
+    def total(key):
+        return sum((source_totals[key] for source_totals in totals), 0)
+
+    opening_native = account.get_visible_balance() - total('net_since_start')
+    opening_balance = _money(opening_native * rate)
+    closing_balance = _money((opening_native + total('net_in_period')) * rate)
+
+    # Archived lines all precede hot ones, so each table's running balance starts
+    # where the previous one's period total left off
+    lines = []
+    carried = opening_balance
+    for source, source_totals in zip(sources, totals):
+        lines.append(
+            source.filter(in_period)
+            .annotate(
+                statement_amount=_scaled(F('amount'), rate),
+                statement_currency=Value(currency, output_field=CharField()),
+                running_balance=Window(
+                    expression=Sum(_scaled(SIGNED_AMOUNT, rate)),
+                    order_by=[F('created_at').asc(), F('id').asc()],
+                ) + Value(carried, output_field=MONEY),
+            )
+            .order_by('created_at', 'id')
+        )
+        carried = _money(carried + source_totals['net_in_period'] * rate)
+
+    return {
+        'currency': currency,
+        'opening_balance': opening_balance,
+        'closing_balance': closing_balance,
+        'totals': {
+            'CREDIT': {'total': _money(total('credit_total') * rate), 'count': total('credit_count')},
+            'DEBIT': {'total': _money(total('debit_total') * rate), 'count': total('debit_count')},
+        },
+        'lines': TransactionHistory(lines),
+    }
@@ -0,0 +1,242 @@
+import atexit
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300
+
+_registry = {}
+_queue = None
+_queue_lock = threading.Lock()
+
+
+class QueueFull(Exception):
+    pass
+
+
+def backend():
+    # 'thread' runs tasks on a pool inside the process that queued them;
+    # 'database' stores them for the run_task_worker command
+    return getattr(settings, 'TASK_QUEUE_BACKEND', 'thread')
+
+
+class Task:
+    def __init__(self, func, max_retries, backoff):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def retry_delay(self, attempts):
+        return self.backoff * 2 ** (attempts - 1)
+
+    def delay(self, *args, **kwargs):
+        # Nothing runs before the surrounding transaction commits, and nothing at
+        # all if it rolls back. Arguments must be JSON-serializable, so pass ids.
+        if backend() == 'database':
+            # The row commits with the caller's transaction
+            BackgroundTask.objects.create(name=self.name, args=list(args), kwargs=kwargs)
+        else:
+            transaction.on_commit(lambda: _submit(Job(self, args, kwargs)))
+
+
+def task(max_retries=3, backoff=1.0):
+    def decorator(func):
+        registered = Task(func, max_retries, backoff)
+        _registry[registered.name] = registered
+        return registered
+    return decorator
+
+
+def get_task(name):
+    if name not in _registry:
+        # A standalone worker only knows tasks whose modules it has imported
+        import_module(name.rsplit('.', 1)[0])
+    return _registry[name]
+
+
+class Job:
+    def __init__(self, task, args, kwargs, attempts=0):
+        self.task = task
+        self.args = args
+        self.kwargs = kwargs
+        self.attempts = attempts
+
+    def run(self):
+        self.attempts += 1
+        self.task(*self.args, **self.kwargs)
+
+    def succeeded(self):
+        pass
+
+    def failed(self, exc, queue):
+        if self.attempts <= self.task.max_retries:
+            queue.submit(self, delay=self.task.retry_delay(self.attempts), retry=True)
+        else:
+            logger.error('Task %s failed after %d attempts', self.task.name, self.attempts, exc_info=exc)
+
+
+class DatabaseJob(Job):
+    def __init__(self, row):
+        super().__init__(None, row.args, row.kwargs, row.attempts)
+        self.row = row
+
+    def run(self):
+        self.attempts += 1
+        self.task = get_task(self.row.name)
+        self.task(*self.args, **self.kwargs)
+
+    def succeeded(self):
+        BackgroundTask.objects.filter(pk=self.row.pk).delete()
+
+    def failed(self, exc, queue):
+        # Retries go back through the table, so they survive a worker restart
+        max_retries = self.task.max_retries if self.task else 0
+        update = {'attempts': self.attempts, 'locked_until': None, 'last_error': repr(exc)}
+        if self.attempts <= max_retries:
+            update['run_after'] = timezone.now() + timedelta(seconds=self.task.retry_delay(self.attempts))
+        else:
+            update['failed_at'] = timezone.now()
+            logger.error('Task %s failed after %d attempts', self.row.name, self.attempts, exc_info=exc)
+        BackgroundTask.objects.filter(pk=self.row.pk).update(**update)
+
+
+class TaskQueue:
+    # A bounded number of worker threads over a bounded queue of jobs ordered by
+    # when they are due; retries wait out their backoff in the queue rather than
+    # holding a thread. Threads start on the first submit.
+
+    def __init__(self, workers=4, max_size=1000):
+        self.workers = workers
+        self.max_size = max_size
+        self._pending = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._closed = False
+        self._threads = []
+        self._condition = threading.Condition()
+
+    def size(self):
+        with self._condition:
+            return len(self._pending) + self._active
+
+    def submit(self, job, delay=0, retry=False):
+        # Retries are let past the bound, since their job was already admitted
+        with self._condition:
+            if not retry and (self._closed or len(self._pending) >= self.max_size):
+                raise QueueFull()
+            heapq.heappush(self._pending, (time.monotonic() + delay, next(self._sequence), job))
+            if not self._threads:
+                self._threads = [
+                    threading.Thread(target=self._work, name=f'task-worker-{index}', daemon=True)
+                    for index in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+            self._condition.notify_all()
+
+    def _next_job(self):
+        with self._condition:
+            while True:
+                timeout = None
+                if self._pending:
+                    timeout = self._pending[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        self._active += 1
+                        return heapq.heappop(self._pending)[2]
+                elif self._closed:
+                    return None
+                self._condition.wait(timeout)
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                try:
+                    job.run()
+                except Exception as exc:
+                    job.failed(exc, self)
+                else:
+                    job.succeeded()
+            except Exception:
+                logger.exception('Could not record the outcome of a background task')
+            finally:
+                close_old_connections()
+                with self._condition:
+                    self._active -= 1
+                    self._condition.notify_all()
+
+    def drain(self, timeout=None):
+        # Waits for every queued job, pending retries included; False on timeout
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._active, timeout)
+
+    def shutdown(self, timeout=None):
+        # Stops admitting jobs and gives the queued ones up to timeout to finish
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        drained = self.drain(timeout)
+        if not drained:
+            # Worker threads are daemons, so unfinished jobs do not block exit
+            logger.warning('Shut down with %d background tasks unfinished', self.size())
+            return False
+        for thread in self._threads:
+            thread.join()
+        return True
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = TaskQueue(getattr(settings, 'TASK_QUEUE_WORKERS', 4),
+                               getattr(settings, 'TASK_QUEUE_MAX_SIZE', 1000))
+            atexit.register(_queue.shutdown, getattr(settings, 'TASK_QUEUE_DRAIN_SECONDS', 10))
+        return _queue
+
+
+def _submit(job):
+    try:
+        get_queue().submit(job)
+    except QueueFull:
+        # Overloaded: the work still happens, at the cost of this request's latency
+        logger.warning('Background task queue is full; running %s inline', job.task.name)
+        try:
+            job.run()
+        except Exception:
+            logger.exception('Task %s failed', job.task.name)
+
+
+def claim_due_tasks(limit, lease=LEASE_SECONDS):
+    # Leased rather than deleted, so a task whose worker died is picked up again
+    # once its lease runs out
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            BackgroundTask.objects.select_for_update(skip_locked=True)
+            .filter(failed_at__isnull=True, run_after__lte=now)
+            .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+            .order_by('run_after')[:limit]
+        )
+        BackgroundTask.objects.filter(pk__in=[row.pk for row in rows]) \
+            .update(locked_until=now + timedelta(seconds=lease))
+    return [DatabaseJob(row) for row in rows]
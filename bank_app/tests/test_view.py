@@ -1,10 +1,46 @@
+import json
+import threading
 import pytest
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from django.apps import apps
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
 from django.urls import reverse
-from bank_app.models import CustomUser, BankAccount, DebitCard
+from bank_app.models import CustomUser, BankAccount, DebitCard, DebitCardRequest, Transaction, DailyBalance, \
+    IdempotencyKey, Transfer, ArchivedTransaction, BackgroundTask, BalanceShard, IdentifierSequence
+from bank_app import eligibility, fx, tasks, velocity
+from bank_app.authentication import revocation_cache
+from bank_app.metrics import registry
+from bank_app.identifiers import BlockAllocator, IdentifierSpaceExhausted, generate_card_numbers, \
+    generate_unique_account_id, is_iban_valid, is_luhn_valid
 from bank_app.serializers import CustomUserSerializer
-from bank_app.serializers import BankAccountSerializer, DebitCardSerializer
+from bank_app.serializers import BankAccountSerializer, DebitCardSerializer, TransactionSerializer
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    # Tests run against a local cache instead of the shared Redis one; cached
+    # eligibility, exchange rates and token revocation state must not leak between tests
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    cache.clear()
+    fx.rate_cache.invalidate()
+    revocation_cache.clear()
+    yield
+    cache.clear()
+    fx.rate_cache.invalidate()
+    revocation_cache.clear()
 
 
 @pytest.fixture
@@ -250,3 +286,1301 @@ class TestClientDebitCardView:
         response = client.get(url, format='json')
 
         assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.fixture
+def create_funded_accounts(create_debit_card):
+    # Fund the client's account and create a second client with an approved card to receive money
+    sender_account = create_debit_card.connected_account
+    sender_account.balance = Decimal('100.00')
+    sender_account.save()
+
+    receiver_user = CustomUser.objects.create_user(
+        username='receiver_username',
+        password='receiver_password',
+        is_client=True
+    )
+    receiver_account = BankAccount.objects.create(
+        user=receiver_user,
+        account_id='ACCT_87654321',
+        iban='IBAN_receiver12345',
+        currency='EUR',
+        balance=0.00,
+        is_approved=True
+    )
+    DebitCard.objects.create(
+        card_number='6543210987654321',
+        expiration_date='2023-12-31',
+        connected_account=receiver_account,
+        is_approved=True
+    )
+    return sender_account, receiver_account
+
+
+@pytest.mark.django_db
+class TestTransactionCreateView:
+
+    def test_transfer_success(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        url = reverse('create-transaction')
+        response = client.post(url, {'receiver_iban': receiver_account.iban, 'amount': '40.10'}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+
+        sender_account.refresh_from_db()
+        receiver_account.refresh_from_db()
+        assert sender_account.balance == Decimal('59.90')
+        assert receiver_account.balance == Decimal('40.10')
+        assert Transaction.objects.filter(bank_account=sender_account, transaction_type='DEBIT').count() == 1
+        assert Transaction.objects.filter(bank_account=receiver_account, transaction_type='CREDIT').count() == 1
+
+    def test_transfer_insufficient_balance(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        url = reverse('create-transaction')
+        response = client.post(url, {'receiver_iban': receiver_account.iban, 'amount': '100.01'}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        sender_account.refresh_from_db()
+        receiver_account.refresh_from_db()
+        assert sender_account.balance == Decimal('100.00')
+        assert receiver_account.balance == Decimal('0.00')
+        assert not Transaction.objects.exists()
+
+    def test_transfer_rejects_non_positive_amount(self, create_client_user, create_funded_accounts):
+        _, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        url = reverse('create-transaction')
+        response = client.post(url, {'receiver_iban': receiver_account.iban, 'amount': '-5'}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Transaction.objects.exists()
+
+
+@pytest.mark.django_db
+class TestWithdrawalAndDepositViews:
+
+    def test_withdraw_success(self, create_client_user, create_funded_accounts):
+        sender_account, _ = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        response = client.post(reverse('withdraw'), {'amount': '30'}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        sender_account.refresh_from_db()
+        assert sender_account.balance == Decimal('70.00')
+
+    def test_withdraw_insufficient_balance(self, create_client_user, create_funded_accounts):
+        sender_account, _ = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        response = client.post(reverse('withdraw'), {'amount': '150'}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        sender_account.refresh_from_db()
+        assert sender_account.balance == Decimal('100.00')
+
+    def test_deposit_success(self, create_client_user, create_funded_accounts):
+        sender_account, _ = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        response = client.post(reverse('deposit'), {'amount': '12.50'}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        sender_account.refresh_from_db()
+        assert sender_account.balance == Decimal('112.50')
+        assert Transaction.objects.get(bank_account=sender_account).transaction_type == 'CREDIT'
+
+
+@pytest.mark.django_db
+class TestBatchTransactionCreateView:
+
+    def test_batch_transfer_success(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        url = reverse('create-batch-transaction')
+        data = {'transfers': [
+            {'receiver_iban': receiver_account.iban, 'amount': '10.00'},
+            {'receiver_iban': receiver_account.iban, 'amount': '15.50'},
+        ]}
+        response = client.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['count'] == 2
+
+        sender_account.refresh_from_db()
+        receiver_account.refresh_from_db()
+        assert sender_account.balance == Decimal('74.50')
+        assert receiver_account.balance == Decimal('25.50')
+        assert Transaction.objects.filter(bank_account=sender_account, transaction_type='DEBIT').count() == 2
+
+    def test_batch_transfer_reports_invalid_legs(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        url = reverse('create-batch-transaction')
+        data = {'transfers': [
+            {'receiver_iban': receiver_account.iban, 'amount': '10.00'},
+            {'receiver_iban': 'IBAN_unknown', 'amount': '5.00'},
+        ]}
+        response = client.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert [error['index'] for error in response.data['errors']] == [1]
+        assert not Transaction.objects.exists()
+
+    def test_batch_transfer_rejects_non_string_iban(self, create_client_user, create_funded_accounts):
+        _, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        url = reverse('create-batch-transaction')
+        data = {'transfers': [
+            {'receiver_iban': 'IBAN_unknown', 'amount': '5.00'},
+            {'receiver_iban': [receiver_account.iban], 'amount': '10.00'},
+            {'receiver_iban': {'iban': receiver_account.iban}, 'amount': '10.00'},
+        ]}
+        response = client.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert [(error['index'], error['detail']) for error in response.data['errors']] == [
+            (0, "Invalid receiver IBAN or the receiver has no approved debit card."),
+            (1, "Receiver IBAN must be a string."),
+            (2, "Receiver IBAN must be a string."),
+        ]
+        assert not Transaction.objects.exists()
+
+    def test_batch_transfer_insufficient_balance_is_atomic(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        url = reverse('create-batch-transaction')
+        data = {'transfers': [
+            {'receiver_iban': receiver_account.iban, 'amount': '60.00'},
+            {'receiver_iban': receiver_account.iban, 'amount': '60.00'},
+        ]}
+        response = client.post(url, data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        receiver_account.refresh_from_db()
+        assert receiver_account.balance == Decimal('0.00')
+        assert not Transaction.objects.exists()
+
+
+@pytest.mark.django_db
+class TestClientTransactionListView:
+
+    def test_list_is_cursor_paginated_newest_first(self, create_client_user, create_debit_card):
+        bank_account = create_debit_card.connected_account
+        for amount in ('1.00', '2.00', '3.00'):
+            Transaction.objects.create(bank_account=bank_account, amount=amount, currency='EUR',
+                                       transaction_type='CREDIT')
+
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        url = reverse('client-transaction-list')
+        response = client.get(url, {'page_size': 2}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [row['amount'] for row in response.data['results']] == ['3.00', '2.00']
+        assert response.data['next'] is not None
+
+        response = client.get(response.data['next'], format='json')
+
+        assert [row['amount'] for row in response.data['results']] == ['1.00']
+        assert response.data['next'] is None
+
+
+@pytest.mark.django_db
+class TestBankerTransactionExportView:
+
+    def test_export_csv_streams_filtered_rows(self, create_banker_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        Transaction.objects.create(bank_account=sender_account, amount='5.00', currency='EUR',
+                                   transaction_type='DEBIT')
+        Transaction.objects.create(bank_account=receiver_account, amount='5.00', currency='EUR',
+                                   transaction_type='CREDIT')
+
+        client = APIClient()
+        client.force_authenticate(user=create_banker_user)
+
+        url = reverse('banker-transaction-export')
+        response = client.get(url, {'iban': receiver_account.iban})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert lines[0] == 'transaction_id,iban,amount,currency,transaction_type,created_at'
+        assert len(lines) == 2
+        assert f'{receiver_account.iban},5.00,EUR,CREDIT' in lines[1]
+
+    def test_export_ndjson(self, create_banker_user, create_funded_accounts):
+        sender_account, _ = create_funded_accounts
+        Transaction.objects.create(bank_account=sender_account, amount='7.25', currency='EUR',
+                                   transaction_type='DEBIT')
+
+        client = APIClient()
+        client.force_authenticate(user=create_banker_user)
+
+        url = reverse('banker-transaction-export')
+        response = client.get(url, {'export_format': 'ndjson', 'start': '2000-01-01'})
+
+        assert response.status_code == status.HTTP_200_OK
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        assert rows[0]['amount'] == '7.25'
+        assert rows[0]['iban'] == sender_account.iban
+
+    def test_export_forbidden_for_clients(self, create_client_user):
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        response = client.get(reverse('banker-transaction-export'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestDailyBalanceRollup:
+
+    def test_money_movements_update_rollup(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        client.post(reverse('deposit'), {'amount': '20'}, format='json')
+        client.post(reverse('withdraw'), {'amount': '5'}, format='json')
+        client.post(reverse('create-transaction'), {'receiver_iban': receiver_account.iban, 'amount': '15'},
+                    format='json')
+
+        sender_day = DailyBalance.objects.get(bank_account=sender_account)
+        assert sender_day.credits == Decimal('20.00')
+        assert sender_day.debits == Decimal('20.00')
+        assert sender_day.transaction_count == 3
+        assert sender_day.closing_balance == Decimal('100.00')
+
+        receiver_day = DailyBalance.objects.get(bank_account=receiver_account)
+        assert receiver_day.credits == Decimal('15.00')
+        assert receiver_day.closing_balance == Decimal('15.00')
+
+    def test_rebuild_command_matches_incremental_rollup(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        client.post(reverse('deposit'), {'amount': '20'}, format='json')
+        client.post(reverse('create-transaction'), {'receiver_iban': receiver_account.iban, 'amount': '15'},
+                    format='json')
+        incremental = list(DailyBalance.objects.order_by('bank_account_id').values(
+            'bank_account_id', 'date', 'credits', 'debits', 'transaction_count', 'closing_balance'))
+
+        call_command('rebuild_daily_balances', stdout=StringIO())
+
+        rebuilt = list(DailyBalance.objects.order_by('bank_account_id').values(
+            'bank_account_id', 'date', 'credits', 'debits', 'transaction_count', 'closing_balance'))
+        assert rebuilt == incremental
+
+
+@pytest.mark.django_db
+class TestClientStatementView:
+
+    def test_statement_balances_and_running_balance(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        client.post(reverse('deposit'), {'amount': '20'}, format='json')
+        client.post(reverse('withdraw'), {'amount': '5'}, format='json')
+        client.post(reverse('create-transaction'), {'receiver_iban': receiver_account.iban, 'amount': '15'},
+                    format='json')
+
+        response = client.get(reverse('client-statement'), format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['opening_balance'] == '100.00'
+        assert response.data['closing_balance'] == '100.00'
+        assert response.data['totals']['CREDIT'] == {'total': '20.00', 'count': 1}
+        assert response.data['totals']['DEBIT'] == {'total': '20.00', 'count': 2}
+        assert [line['running_balance'] for line in response.data['lines']] == ['120.00', '115.00', '100.00']
+
+    def test_statement_for_future_period_is_empty(self, create_client_user, create_funded_accounts):
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('deposit'), {'amount': '20'}, format='json')
+
+        response = client.get(reverse('client-statement'), {'start': '2999-01-01'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['opening_balance'] == '120.00'
+        assert response.data['closing_balance'] == '120.00'
+        assert response.data['lines'] == []
+
+
+@pytest.mark.django_db
+class TestEligibilityCache:
+
+    def test_cached_eligibility_skips_lookup_queries(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        url = reverse('create-transaction')
+        data = {'receiver_iban': receiver_account.iban, 'amount': '1'}
+
+        client.post(url, data, format='json')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert not [query for query in queries if 'bank_app_debitcard' in query['sql']]
+
+    def test_card_revocation_invalidates_cache(self, create_client_user, create_funded_accounts,
+                                               django_capture_on_commit_callbacks):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        url = reverse('create-transaction')
+        data = {'receiver_iban': receiver_account.iban, 'amount': '1'}
+
+        assert client.post(url, data, format='json').status_code == status.HTTP_201_CREATED
+
+        card = DebitCard.objects.get(connected_account=receiver_account)
+        with django_capture_on_commit_callbacks(execute=True):
+            card.is_approved = False
+            card.save()
+            # Dropped only once the write commits, so nobody re-caches the old row
+            assert eligibility.get_account_for_iban(receiver_account.iban).has_approved_card
+
+        response = client.post(url, data, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['detail'] == "The receiver must have an approved debit card to perform a transaction."
+
+
+    def test_iban_change_drops_old_key_without_extra_query(self, create_funded_accounts,
+                                                           django_capture_on_commit_callbacks):
+        _, receiver_account = create_funded_accounts
+        old_iban = receiver_account.iban
+        eligibility.get_account_for_iban(old_iban)
+        account = BankAccount.objects.get(pk=receiver_account.pk)
+
+        with django_capture_on_commit_callbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            account.iban = 'IBAN_renamed12345'
+            account.save()
+
+        assert [query['sql'].split()[0] for query in queries] == ['UPDATE']
+        with pytest.raises(BankAccount.DoesNotExist):
+            eligibility.get_account_for_iban(old_iban)
+
+
+@pytest.mark.django_db
+class TestStatelessJWTAuthentication:
+
+    def obtain_access_token(self, username, password):
+        response = APIClient().post(reverse('token_obtain_pair'), {'username': username, 'password': password},
+                                    format='json')
+        assert response.status_code == status.HTTP_200_OK
+        return response.data['access']
+
+    def test_token_carries_role_claims(self, create_client_user, create_bank_account):
+        access = self.obtain_access_token('client_username', 'client_password')
+
+        token = AccessToken(access)
+        assert token['is_client'] is True
+        assert token['is_banker'] is False
+        assert 'account_id' not in token
+
+    def test_request_does_not_query_user_table(self, create_client_user, create_bank_account, settings):
+        settings.JWT_REVOCATION_CHECK = False
+        access = self.obtain_access_token('client_username', 'client_password')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('client-retrieve-bank-account'), format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not [query for query in queries if 'bank_app_customuser' in query['sql']]
+
+    def test_revocation_check_queries_user_once_per_ttl(self, create_client_user, create_bank_account):
+        access = self.obtain_access_token('client_username', 'client_password')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse('client-retrieve-bank-account'), format='json')
+            response = client.get(reverse('client-retrieve-bank-account'), format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len([query for query in queries if 'bank_app_customuser' in query['sql']]) == 1
+
+    def test_revocation_check_rejects_deactivated_user(self, create_client_user, create_bank_account):
+        access = self.obtain_access_token('client_username', 'client_password')
+        create_client_user.is_active = False
+        create_client_user.save()
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = client.get(reverse('client-retrieve-bank-account'), format='json')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestIdempotencyKeys:
+
+    def test_retry_replays_original_response(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        url = reverse('create-transaction')
+        data = {'receiver_iban': receiver_account.iban, 'amount': '10'}
+
+        first = client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='transfer-1')
+        second = client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY='transfer-1')
+
+        assert first.status_code == second.status_code == status.HTTP_201_CREATED
+        assert second['Idempotent-Replayed'] == 'true'
+        sender_account.refresh_from_db()
+        assert sender_account.balance == Decimal('90.00')
+        assert Transaction.objects.filter(bank_account=sender_account).count() == 1
+
+    def test_key_reused_with_different_request_is_rejected(self, create_client_user, create_funded_accounts):
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        client.post(reverse('deposit'), {'amount': '10'}, format='json', HTTP_IDEMPOTENCY_KEY='deposit-1')
+        response = client.post(reverse('deposit'), {'amount': '20'}, format='json', HTTP_IDEMPOTENCY_KEY='deposit-1')
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert Transaction.objects.count() == 1
+
+    def test_purge_command_removes_expired_keys(self, create_client_user, create_funded_accounts):
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('deposit'), {'amount': '10'}, format='json', HTTP_IDEMPOTENCY_KEY='deposit-1')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+
+        call_command('purge_idempotency_keys', stdout=StringIO())
+
+        assert not IdempotencyKey.objects.exists()
+
+
+@pytest.mark.django_db
+class TestAsyncReadViews:
+    # Django's test client drives the async views through async_to_sync
+
+    def token_client(self, user):
+        token = AccessToken.for_user(user)
+        token['is_client'] = user.is_client
+        token['is_banker'] = user.is_banker
+        return Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_async_bank_account_matches_sync_view(self, create_client_user, create_bank_account):
+        client = self.token_client(create_client_user)
+
+        response = client.get(reverse('async-client-retrieve-bank-account'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == json.loads(json.dumps(BankAccountSerializer(create_bank_account).data))
+
+    def test_async_bank_account_includes_shard_credits(self, create_client_user, create_bank_account):
+        call_command('configure_balance_shards', create_bank_account.iban, '2', stdout=StringIO())
+        create_bank_account.shards.filter(shard=1).update(balance=Decimal('7.50'))
+        client = self.token_client(create_client_user)
+
+        response = client.get(reverse('async-client-retrieve-bank-account'))
+
+        assert response.status_code == status.HTTP_200_OK
+        create_bank_account.refresh_from_db()
+        assert response.json()['balance'] == BankAccountSerializer(create_bank_account).data['balance']
+        assert Decimal(response.json()['balance']) == create_bank_account.balance + Decimal('7.50')
+
+    def test_async_transaction_list_paginates(self, create_client_user, create_debit_card):
+        bank_account = create_debit_card.connected_account
+        for amount in ('1.00', '2.00', '3.00'):
+            Transaction.objects.create(bank_account=bank_account, amount=amount, currency='EUR',
+                                       transaction_type='CREDIT')
+        client = self.token_client(create_client_user)
+
+        first = client.get(reverse('async-client-transaction-list'), {'page_size': 2}).json()
+        second = client.get(first['next']).json()
+
+        assert [row['amount'] for row in first['results']] == ['3.00', '2.00']
+        assert [row['amount'] for row in second['results']] == ['1.00']
+        assert second['next'] is None
+
+    def test_async_views_require_client_token(self, create_banker_user):
+        assert Client().get(reverse('async-client-debit-cards')).status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = self.token_client(create_banker_user).get(reverse('async-client-debit-cards'))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestShardedBalances:
+
+    def test_credits_land_on_shards_and_compact_back(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        call_command('configure_balance_shards', receiver_account.iban, '4', stdout=StringIO())
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        for _ in range(3):
+            response = client.post(reverse('create-transaction'),
+                                   {'receiver_iban': receiver_account.iban, 'amount': '10'}, format='json')
+            assert response.status_code == status.HTTP_201_CREATED
+
+        receiver_account.refresh_from_db()
+        assert receiver_account.balance == Decimal('0.00')
+        assert receiver_account.get_visible_balance() == Decimal('30.00')
+        assert BankAccountSerializer(receiver_account).data['balance'] == '30.00'
+
+        call_command('compact_balance_shards', stdout=StringIO())
+
+        receiver_account.refresh_from_db()
+        assert receiver_account.balance == Decimal('30.00')
+        assert not receiver_account.shards.exclude(balance=0).exists()
+        assert DailyBalance.objects.get(bank_account=receiver_account).closing_balance == Decimal('30.00')
+
+    @pytest.mark.parametrize('shards', [0, 2])
+    def test_stale_shard_count_does_not_lose_credits(self, create_client_user, create_funded_accounts, shards):
+        sender_account, receiver_account = create_funded_accounts
+        call_command('configure_balance_shards', receiver_account.iban, '4', stdout=StringIO())
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('create-transaction'), {'receiver_iban': receiver_account.iban, 'amount': '1'},
+                    format='json')
+        # Reconfigured behind the cached eligibility entry, which still says 4 shards
+        receiver_account.refresh_from_db()
+        pending = receiver_account.get_visible_balance()
+        receiver_account.shards.all().delete()
+        BalanceShard.objects.bulk_create([BalanceShard(bank_account=receiver_account, shard=index)
+                                          for index in range(shards)])
+        BankAccount.objects.filter(pk=receiver_account.pk).update(balance=pending, balance_shards=shards)
+
+        for _ in range(4):
+            response = client.post(reverse('create-transaction'),
+                                   {'receiver_iban': receiver_account.iban, 'amount': '10'}, format='json')
+            assert response.status_code == status.HTTP_201_CREATED
+        response = client.post(reverse('create-batch-transaction'), {'transfers': [
+            {'receiver_iban': receiver_account.iban, 'amount': '5'}]}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+
+        receiver_account.refresh_from_db()
+        assert receiver_account.get_visible_balance() == Decimal('46.00')
+        sender_account.refresh_from_db()
+        assert sender_account.balance == Decimal('54.00')
+
+
+@pytest.mark.django_db
+class TestTransferJournal:
+
+    def test_transfer_writes_linked_legs(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        client.post(reverse('create-transaction'), {'receiver_iban': receiver_account.iban, 'amount': '10'},
+                    format='json')
+
+        transfer = Transfer.objects.get()
+        assert transfer.debit_account == sender_account
+        assert transfer.credit_account == receiver_account
+        assert sorted(transfer.legs.values_list('transaction_type', flat=True)) == ['CREDIT', 'DEBIT']
+
+    def test_banker_lists_transfers_by_counterparty(self, create_client_user, create_banker_user,
+                                                    create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('create-batch-transaction'), {'transfers': [
+            {'receiver_iban': receiver_account.iban, 'amount': '1.00'},
+            {'receiver_iban': receiver_account.iban, 'amount': '2.00'},
+        ]}, format='json')
+
+        banker = APIClient()
+        banker.force_authenticate(user=create_banker_user)
+        response = banker.get(reverse('banker-transfer-list'),
+                              {'payer_iban': sender_account.iban, 'payee_iban': receiver_account.iban})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(row['amount'] for row in response.data['results']) == ['1.00', '2.00']
+        assert Transaction.objects.filter(transfer__isnull=True).count() == 0
+
+
+@pytest.mark.django_db
+class TestBulkReviewViews:
+
+    def test_bulk_approve_bank_accounts_reports_missing_ids(self, create_banker_user, create_bank_account):
+        create_bank_account.is_approved = False
+        create_bank_account.save()
+        client = APIClient()
+        client.force_authenticate(user=create_banker_user)
+
+        response = client.post(reverse('banker-bulk-review-bank-accounts'),
+                               {'ids': [create_bank_account.pk, 999999]}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [result['status'] for result in response.data['results']] == ['approved', 'error']
+        create_bank_account.refresh_from_db()
+        assert create_bank_account.is_approved is True
+
+    def test_bulk_review_debit_card_requests(self, create_banker_user, create_bank_account):
+        other_user = CustomUser.objects.create_user(username='other_client', password='other_password',
+                                                    is_client=True)
+        approved = DebitCardRequest.objects.create(client=create_bank_account.user, monthly_salary=800)
+        rejected = DebitCardRequest.objects.create(client=other_user, monthly_salary=600)
+        no_account = DebitCardRequest.objects.create(client=other_user, monthly_salary=700)
+        client = APIClient()
+        client.force_authenticate(user=create_banker_user)
+
+        response = client.post(reverse('banker-bulk-review-debit-card-requests'), {'decisions': [
+            {'id': approved.pk, 'is_approved': True},
+            {'id': rejected.pk, 'is_approved': False, 'rejection_reason': 'Insufficient history.'},
+            {'id': no_account.pk, 'is_approved': True},
+        ]}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [result['status'] for result in response.data['results']] == ['approved', 'rejected', 'error']
+        assert DebitCard.objects.get(connected_account=create_bank_account).is_approved is True
+        rejected.refresh_from_db()
+        assert rejected.rejection_reason == 'Insufficient history.'
+
+        pending = client.get(reverse('banker-list-debit-card-requests'))
+        assert [row['id'] for row in pending.data] == [no_account.pk]
+
+    @pytest.mark.parametrize('decision', [
+        {'is_approved': False, 'rejection_reason': ['a', 'b']},
+        {'is_approved': False, 'rejection_reason': {'reason': 'a'}},
+        {'is_approved': False, 'rejection_reason': 5},
+        {'is_approved': False, 'rejection_reason': '  '},
+        {'id': True, 'is_approved': True},
+    ])
+    def test_bulk_review_rejects_malformed_decisions(self, create_banker_user, create_bank_account, decision):
+        request = DebitCardRequest.objects.create(client=create_bank_account.user, monthly_salary=800)
+        client = APIClient()
+        client.force_authenticate(user=create_banker_user)
+
+        response = client.post(reverse('banker-bulk-review-debit-card-requests'),
+                               {'decisions': [{'id': request.pk, **decision}]}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        request.refresh_from_db()
+        assert (request.is_approved, request.rejection_reason) == (False, None)
+
+
+@pytest.mark.django_db
+class TestDebitCardDecisionCommand:
+
+    def test_decides_pending_requests_in_batches(self, create_client_user, create_funded_accounts):
+        _, receiver_account = create_funded_accounts
+        receiver_account.debitcard.delete()
+        accounts = {}
+        for username, is_approved in [('low_salary_client', True), ('unapproved_client', False)]:
+            user = CustomUser.objects.create_user(username=username, password='password', is_client=True)
+            accounts[username] = BankAccount.objects.create(
+                user=user, account_id=f'ACCT_{username[:8]}', iban=f'IBAN_{username[:12]}', currency='EUR',
+                balance=0, is_approved=is_approved)
+
+        approved = DebitCardRequest.objects.create(client=receiver_account.user, monthly_salary=500)
+        low_salary = DebitCardRequest.objects.create(client=accounts['low_salary_client'].user,
+                                                     monthly_salary='499.99')
+        carded = DebitCardRequest.objects.create(client=create_client_user, monthly_salary=900)
+        pending = DebitCardRequest.objects.create(client=accounts['unapproved_client'].user, monthly_salary=900)
+        out = StringIO()
+
+        call_command('decide_debit_card_requests', '--batch-size', '2', stdout=out)
+
+        assert 'Approved 1, rejected 2, left 1 pending for review, 0 errors.' in out.getvalue()
+        assert DebitCard.objects.get(connected_account=receiver_account).is_approved is True
+        assert DebitCardRequest.objects.get(pk=approved.pk).is_approved is True
+        assert DebitCardRequest.objects.get(pk=low_salary.pk).rejection_reason == \
+            'Monthly salary is below 500 euros.'
+        assert DebitCardRequest.objects.get(pk=carded.pk).rejection_reason == \
+            'A debit card is already connected to this account.'
+        pending.refresh_from_db()
+        assert (pending.is_approved, pending.rejection_reason) == (False, None)
+
+
+@pytest.mark.django_db
+class TestImportClientsCommand:
+
+    def test_import_creates_clients_and_reports_rejections(self, create_client_user, tmp_path):
+        source = tmp_path / 'clients.csv'
+        source.write_text(
+            'username,password,email\n'
+            'new_client_1,secret-one,one@example.com\n'
+            'new_client_2,secret-two,\n'
+            'client_username,secret-three,\n'
+            'new_client_1,secret-four,\n'
+            ',secret-five,\n'
+        )
+        report = tmp_path / 'report.json'
+
+        call_command('import_clients', str(source), '--workers', '2', '--report', str(report), stdout=StringIO())
+
+        imported = CustomUser.objects.get(username='new_client_1')
+        assert imported.is_client is True
+        assert imported.check_password('secret-one')
+        assert CustomUser.objects.filter(username='new_client_2').exists()
+        assert [row['row'] for row in json.loads(report.read_text())] == [3, 4, 5]
+
+    def test_import_reports_malformed_ndjson_lines_and_continues(self, tmp_path):
+        source = tmp_path / 'clients.ndjson'
+        source.write_text(
+            '{"username": "new_client_1", "password": "secret-one"}\n'
+            '\n'
+            '{"username": "new_client_2", "password": \n'
+            '{"username": "new_client_3", "password": "secret-three"}\n'
+        )
+        report = tmp_path / 'report.json'
+
+        call_command('import_clients', str(source), '--workers', '1', '--chunk-size', '1',
+                     '--report', str(report), stdout=StringIO())
+
+        assert sorted(CustomUser.objects.values_list('username', flat=True)) == ['new_client_1', 'new_client_3']
+        assert json.loads(report.read_text()) == [
+            {'row': 2, 'username': None, 'reason': 'Invalid JSON on line 3: Expecting value.'},
+        ]
+
+    def test_import_rejects_non_string_values(self, tmp_path):
+        source = tmp_path / 'clients.ndjson'
+        source.write_text(
+            '{"username": "new_client_1", "password": 12345}\n'
+            '{"username": "new_client_2", "password": "secret-two", "email": true}\n'
+            '{"username": ["new_client_3"], "password": "secret-three"}\n'
+            '{"username": "new_client_4", "password": "secret-four", "last_name": null}\n'
+        )
+        report = tmp_path / 'report.json'
+
+        call_command('import_clients', str(source), '--workers', '1', '--report', str(report), stdout=StringIO())
+
+        assert list(CustomUser.objects.values_list('username', flat=True)) == ['new_client_4']
+        assert [(row['row'], row['reason']) for row in json.loads(report.read_text())] == [
+            (1, 'Password must be a string.'),
+            (2, 'Email must be a string.'),
+            (3, 'Username must be a string.'),
+        ]
+
+
+@pytest.mark.django_db
+class TestIdentifierAllocation:
+
+    def test_requested_account_gets_checksum_valid_identifiers(self, create_client_user):
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        client.post(reverse('client-request-bank-account'), data={}, format='json')
+
+        bank_account = BankAccount.objects.get(user=create_client_user)
+        assert is_iban_valid(bank_account.iban)
+        assert is_luhn_valid(bank_account.account_id[len('ACCT_'):])
+
+    def test_card_numbers_are_monotonic_and_luhn_valid(self):
+        first, second = generate_card_numbers(2)
+        assert len(first) == 16
+        assert is_luhn_valid(first) and is_luhn_valid(second)
+        assert int(second[:-1]) == int(first[:-1]) + 1
+
+    def test_card_numbers_past_nine_digits_raise(self):
+        IdentifierSequence.objects.update_or_create(name='card_number', defaults={'next_value': 10 ** 9 - 1})
+
+        with pytest.raises(IdentifierSpaceExhausted):
+            generate_card_numbers(2)
+
+    def test_account_ids_start_above_numeric_legacy_ids(self, create_bank_account):
+        migration = import_module('bank_app.migrations.0015_account_id_sequence_floor')
+
+        migration.start_above_legacy_account_ids(apps, None)
+
+        assert IdentifierSequence.objects.get(name='account_id').next_value == 1234568
+        assert generate_unique_account_id()[:12] == 'ACCT_1234568'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBlockAllocator:
+
+    def test_allocations_within_a_block_skip_the_database(self):
+        allocator = BlockAllocator('test_sequence', block_size=10)
+        first = allocator.allocate()
+
+        with CaptureQueriesContext(connection) as queries:
+            rest = allocator.allocate(5)
+
+        assert len(queries) == 0
+        assert rest == list(range(first[0] + 1, first[0] + 6))
+
+
+@pytest.mark.django_db
+class TestValuesListSerializers:
+
+    def test_banker_lists_match_model_serializers_byte_for_byte(self, create_banker_user, create_client_user,
+                                                               create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        call_command('configure_balance_shards', receiver_account.iban, '2', stdout=StringIO())
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        for amount in ('10', '0.5', '7.25'):
+            client.post(reverse('create-transaction'), {'receiver_iban': receiver_account.iban, 'amount': amount},
+                        format='json')
+
+        banker = APIClient()
+        banker.force_authenticate(user=create_banker_user)
+        renderer = JSONRenderer()
+
+        accounts = banker.get(reverse('banker-list-bank-accounts'))
+        expected = BankAccountSerializer(BankAccount.objects.all(), many=True).data
+        assert accounts.content == renderer.render(expected)
+        assert '17.75' in accounts.content.decode()
+
+        cards = banker.get(reverse('banker-list-debit-cards'))
+        assert cards.content == renderer.render(DebitCardSerializer(DebitCard.objects.all(), many=True).data)
+
+        transactions = banker.get(reverse('banker-transaction-list'))
+        expected = TransactionSerializer(Transaction.objects.order_by('-created_at', '-id'), many=True).data
+        assert renderer.render(transactions.data['results']) == renderer.render(expected)
+
+
+@pytest.mark.django_db
+class TestBankerClientOverviewView:
+
+    def get_overview(self, banker_user):
+        client = APIClient()
+        client.force_authenticate(user=banker_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('banker-client-overview'))
+        assert response.status_code == status.HTTP_200_OK
+        return response, len(queries)
+
+    def test_overview_combines_account_card_and_requests(self, create_banker_user, create_client_user,
+                                                         create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        DebitCardRequest.objects.create(client=create_client_user, monthly_salary=Decimal('800.00'))
+        DebitCardRequest.objects.create(client=create_client_user, monthly_salary=Decimal('300.00'),
+                                        rejection_reason='Too low')
+        call_command('configure_balance_shards', receiver_account.iban, '2', stdout=StringIO())
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('create-transaction'), {'receiver_iban': receiver_account.iban, 'amount': '10'},
+                    format='json')
+
+        response, _ = self.get_overview(create_banker_user)
+
+        by_username = {row['username']: row for row in response.data}
+        sender = by_username['client_username']
+        assert sender['bank_account']['iban'] == sender_account.iban
+        assert sender['bank_account']['balance'] == '90.00'
+        assert sender['debit_card']['is_approved'] is True
+        assert sender['pending_card_requests'] == 1
+        assert sender['last_transaction_at'] is not None
+        receiver = by_username[receiver_account.user.username]
+        assert receiver['bank_account']['balance'] == '10.00'
+        assert receiver['pending_card_requests'] == 0
+
+    def test_query_count_does_not_grow_with_clients(self, create_banker_user, create_funded_accounts):
+        _, baseline = self.get_overview(create_banker_user)
+
+        for index in range(3):
+            user = CustomUser.objects.create_user(username=f'overview_{index}', password='pw', is_client=True)
+            account = BankAccount.objects.create(user=user, account_id=f'ACCT_OV{index}', iban=f'IBAN_OV{index}',
+                                                 is_approved=True)
+            DebitCard.objects.create(card_number=f'900000000000000{index}', expiration_date='2099-12-31',
+                                     connected_account=account)
+            DebitCardRequest.objects.create(client=user, monthly_salary=Decimal('600.00'))
+        CustomUser.objects.create_user(username='overview_no_account', password='pw', is_client=True)
+
+        response, queries = self.get_overview(create_banker_user)
+
+        assert len(response.data) == 6
+        assert queries == baseline
+        assert next(row for row in response.data if row['username'] == 'overview_no_account')['bank_account'] is None
+
+
+@pytest.mark.django_db
+class TestTransactionArchive:
+
+    @pytest.fixture
+    def archived_history(self, create_client_user, create_funded_accounts):
+        sender_account, _ = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('deposit'), {'amount': '20'}, format='json')
+        client.post(reverse('withdraw'), {'amount': '5'}, format='json')
+        Transaction.objects.filter(bank_account=sender_account).update(
+            created_at=timezone.now() - timedelta(days=400))
+        client.post(reverse('deposit'), {'amount': '10'}, format='json')
+        call_command('rebuild_daily_balances', stdout=StringIO())
+        rollups = list(DailyBalance.objects.filter(bank_account=sender_account)
+                       .order_by('date').values_list('date', 'closing_balance', 'transaction_count'))
+
+        out = StringIO()
+        call_command('archive_transactions', '--keep-months', '0', stdout=out)
+        assert 'Archived 2 transactions' in out.getvalue()
+        return client, sender_account, rollups
+
+    def test_closed_months_move_to_archive(self, archived_history):
+        _, sender_account, _ = archived_history
+
+        assert Transaction.objects.filter(bank_account=sender_account).count() == 1
+        assert ArchivedTransaction.objects.filter(bank_account=sender_account).count() == 2
+
+    def test_history_pages_continue_into_archive(self, archived_history):
+        client, _, _ = archived_history
+
+        first = client.get(reverse('client-transaction-list'), {'page_size': 2})
+        second = client.get(first.data['next'])
+
+        assert [row['amount'] for row in first.data['results']] == ['10.00', '5.00']
+        assert [row['amount'] for row in second.data['results']] == ['20.00']
+        assert second.data['next'] is None
+
+    def test_recent_range_does_not_read_archive(self, archived_history):
+        client, _, _ = archived_history
+        start = timezone.now().date().replace(day=1).isoformat()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('client-transaction-list'), {'start': start})
+
+        assert [row['amount'] for row in response.data['results']] == ['10.00']
+        assert not [query for query in queries if 'bank_app_archivedtransaction' in query['sql']]
+
+    def test_statement_export_and_rollups_include_archive(self, archived_history, create_banker_user):
+        client, sender_account, rollups = archived_history
+
+        statement = client.get(reverse('client-statement'))
+        assert statement.data['opening_balance'] == '100.00'
+        assert [line['running_balance'] for line in statement.data['lines']] == ['120.00', '115.00', '125.00']
+
+        banker = APIClient()
+        banker.force_authenticate(user=create_banker_user)
+        export = banker.get(reverse('banker-transaction-export'), {'export_format': 'ndjson',
+                                                                     'iban': sender_account.iban})
+        lines = [json.loads(line) for line in b''.join(export.streaming_content).decode().splitlines()]
+        assert [line['amount'] for line in lines] == ['20.00', '5.00', '10.00']
+
+        call_command('rebuild_daily_balances', stdout=StringIO())
+        assert list(DailyBalance.objects.filter(bank_account=sender_account).order_by('date')
+                    .values_list('date', 'closing_balance', 'transaction_count')) == rollups
+
+
+@pytest.mark.skipif('replica' not in django_settings.DATABASES,
+                    reason="needs a replica alias, e.g. --ds=banking_project1.local_replica_settings")
+# Not wrapped in a transaction: reads inside one always stay on the primary
+@pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+class TestReplicaRouting:
+
+    def test_read_only_views_use_replica(self, create_banker_user):
+        # Rows that only exist on the replica show the list was served from it
+        user = CustomUser.objects.using('replica').create(username='replica_only', is_client=True)
+        BankAccount.objects.using('replica').create(user=user, account_id='ACCT_REPLICA', iban='IBAN_REPLICA')
+        client = APIClient()
+        client.force_authenticate(user=create_banker_user)
+
+        response = client.get(reverse('banker-list-bank-accounts'))
+
+        assert [account['iban'] for account in response.data] == ['IBAN_REPLICA']
+
+    def test_client_reads_own_writes_until_sticky_window_ends(self, create_client_user, create_funded_accounts):
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        assert client.get(reverse('client-transaction-list')).data['results'] == []
+
+        assert client.post(reverse('deposit'), {'amount': '20'}, format='json').status_code == \
+            status.HTTP_201_CREATED
+        history = client.get(reverse('client-transaction-list')).data['results']
+        assert [row['amount'] for row in history] == ['20.00']
+
+        cache.clear()
+        assert client.get(reverse('client-transaction-list')).data['results'] == []
+
+
+@pytest.mark.django_db
+class TestMultiCurrencyTransfers:
+
+    @pytest.fixture
+    def usd_receiver(self, create_funded_accounts):
+        call_command('set_exchange_rates', 'USD=1.10', 'GBP=0.85', stdout=StringIO())
+        sender_account, receiver_account = create_funded_accounts
+        receiver_account.currency = 'USD'
+        receiver_account.save()
+        return sender_account, receiver_account
+
+    def test_transfer_converts_into_receiver_currency(self, create_client_user, usd_receiver):
+        sender_account, receiver_account = usd_receiver
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        response = client.post(reverse('create-transaction'),
+                               {'receiver_iban': receiver_account.iban, 'amount': '10'}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        sender_account.refresh_from_db()
+        receiver_account.refresh_from_db()
+        assert sender_account.balance == Decimal('90.00')
+        assert receiver_account.balance == Decimal('11.00')
+        transfer = Transfer.objects.get()
+        assert (transfer.amount, transfer.currency, transfer.rate) == (Decimal('10.00'), 'EUR', Decimal('1.1'))
+        assert sorted(transfer.legs.values_list('transaction_type', 'amount', 'currency')) == [
+            ('CREDIT', Decimal('11.00'), 'USD'), ('DEBIT', Decimal('10.00'), 'EUR')]
+
+    def test_rates_are_served_from_process_cache(self, create_client_user, usd_receiver):
+        _, receiver_account = usd_receiver
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('create-transaction'), {'receiver_iban': receiver_account.iban, 'amount': '1'},
+                    format='json')
+
+        with CaptureQueriesContext(connection) as queries:
+            client.post(reverse('create-transaction'), {'receiver_iban': receiver_account.iban, 'amount': '1'},
+                        format='json')
+
+        assert not [query for query in queries if 'bank_app_exchangerate' in query['sql']]
+
+    def test_rate_change_bumps_cache_version(self, usd_receiver, django_capture_on_commit_callbacks):
+        assert fx.rate('EUR', 'USD') == Decimal('1.1')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            call_command('set_exchange_rates', 'USD=1.20', stdout=StringIO())
+
+        assert fx.rate('EUR', 'USD') == Decimal('1.2')
+        assert fx.rate('USD', 'GBP') == Decimal('0.70833333')
+
+    def test_unknown_currency_is_rejected(self, create_client_user, usd_receiver):
+        _, receiver_account = usd_receiver
+        receiver_account.currency = 'JPY'
+        receiver_account.save()
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        response = client.post(reverse('create-transaction'),
+                               {'receiver_iban': receiver_account.iban, 'amount': '10'}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['detail'] == "No exchange rate from EUR to JPY."
+
+    def test_statement_in_another_currency(self, create_client_user, usd_receiver):
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('deposit'), {'amount': '20'}, format='json')
+        client.post(reverse('withdraw'), {'amount': '5'}, format='json')
+
+        response = client.get(reverse('client-statement'), {'currency': 'usd'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['currency'] == 'USD'
+        assert response.data['opening_balance'] == '110.00'
+        assert response.data['closing_balance'] == '126.50'
+        assert response.data['totals']['CREDIT'] == {'total': '22.00', 'count': 1}
+        assert [(line['amount'], line['currency'], line['running_balance']) for line in response.data['lines']] == [
+            ('22.00', 'USD', '132.00'), ('5.50', 'USD', '126.50')]
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+
+    def test_records_latency_sql_and_phases_per_url_name(self, create_banker_user, create_client_user,
+                                                         create_bank_account):
+        registry.reset()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(create_client_user)}')
+        client.get(reverse('client-retrieve-bank-account'), format='json')
+
+        banker = APIClient()
+        banker.force_authenticate(user=create_banker_user)
+        response = banker.get(reverse('banker-metrics'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('text/plain')
+        body = response.content.decode()
+        labels = 'endpoint="client-retrieve-bank-account",method="GET",status="200"'
+        assert f'bank_request_duration_seconds_count{{{labels}}} 1' in body
+        assert f'bank_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in body
+        assert f'bank_sql_queries_total{{{labels}}}' in body
+        assert f'bank_phase_duration_seconds_total{{{labels},phase="auth"}}' in body
+        assert f'bank_phase_duration_seconds_total{{{labels},phase="serializer"}}' in body
+
+    def test_sampling_disabled_records_nothing(self, create_client_user, create_bank_account, settings):
+        settings.METRICS_SAMPLE_RATE = 0
+        registry.reset()
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.get(reverse('client-retrieve-bank-account'), format='json')
+
+        assert 'client-retrieve-bank-account' not in registry.render()
+
+    def test_metrics_require_banker(self, create_client_user):
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        response = client.get(reverse('banker-metrics'))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestVelocityLimits:
+
+    @pytest.fixture(autouse=True)
+    def limits(self, settings):
+        settings.VELOCITY_LIMITS = [
+            {'name': 'withdrawals-per-hour', 'kind': 'withdrawal', 'window': 3600, 'max_count': 2},
+            {'name': 'transferred-per-day', 'kind': 'transfer', 'window': 86400, 'max_amount': '50.00'},
+        ]
+
+    def test_withdrawal_count_limit(self, create_client_user, create_funded_accounts):
+        sender_account, _ = create_funded_accounts
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('withdraw'), {'amount': '1'}, format='json')
+        client.post(reverse('withdraw'), {'amount': '1'}, format='json')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('withdraw'), {'amount': '1'}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['detail'] == "Velocity limit exceeded: withdrawals-per-hour."
+        assert not [query for query in queries if 'bank_app_transaction' in query['sql']]
+        sender_account.refresh_from_db()
+        assert sender_account.balance == Decimal('98.00')
+
+    def test_failed_transfer_releases_its_reservation(self, create_client_user, create_funded_accounts):
+        sender_account, receiver_account = create_funded_accounts
+        sender_account.balance = Decimal('10.00')
+        sender_account.save()
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+
+        response = client.post(reverse('create-transaction'),
+                               {'receiver_iban': receiver_account.iban, 'amount': '40'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        sender_account.balance = Decimal('100.00')
+        sender_account.save()
+
+        response = client.post(reverse('create-transaction'),
+                               {'receiver_iban': receiver_account.iban, 'amount': '40'}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        response = client.post(reverse('create-transaction'),
+                               {'receiver_iban': receiver_account.iban, 'amount': '20'}, format='json')
+        assert response.data['detail'] == "Velocity limit exceeded: transferred-per-day."
+
+    def test_counters_are_seeded_from_recent_debits(self, create_client_user, create_funded_accounts):
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('withdraw'), {'amount': '1'}, format='json')
+        client.post(reverse('withdraw'), {'amount': '1'}, format='json')
+        cache.clear()
+
+        call_command('seed_velocity_limits', stdout=StringIO())
+        response = client.post(reverse('withdraw'), {'amount': '1'}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert cache.get(velocity.SEEDED_KEY) is True
+
+    def test_lost_counters_are_reseeded_off_the_request_path(self, create_client_user, create_funded_accounts,
+                                                             django_capture_on_commit_callbacks):
+        client = APIClient()
+        client.force_authenticate(user=create_client_user)
+        client.post(reverse('withdraw'), {'amount': '1'}, format='json')
+        client.post(reverse('withdraw'), {'amount': '1'}, format='json')
+        cache.clear()
+
+        with django_capture_on_commit_callbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            response = client.post(reverse('withdraw'), {'amount': '1'}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert not [query for query in queries if query['sql'].startswith('SELECT')
+                    and 'bank_app_transaction' in query['sql']]
+        assert len(callbacks) == 1
+        velocity.seed_counters()
+        response = client.post(reverse('withdraw'), {'amount': '1'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+task_calls = []
+
+
+@tasks.task(max_retries=2, backoff=0.01)
+def flaky_task(label, failures):
+    task_calls.append(label)
+    if task_calls.count(label) <= failures:
+        raise RuntimeError(label)
+
+
+class TestBackgroundTasks:
+
+    @pytest.fixture(autouse=True)
+    def fresh_queue(self, monkeypatch):
+        task_calls.clear()
+        queue = tasks.TaskQueue(workers=2, max_size=2)
+        monkeypatch.setattr(tasks, '_queue', queue)
+        yield queue
+        queue.shutdown(5)
+
+    def test_retries_with_backoff_until_success(self, fresh_queue):
+        fresh_queue.submit(tasks.Job(flaky_task, ('retried', 2), {}))
+
+        assert fresh_queue.drain(5)
+        assert task_calls == ['retried'] * 3
+
+    def test_queue_is_bounded_and_drains_on_shutdown(self):
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        queue = tasks.TaskQueue(workers=1, max_size=1)
+        queue.submit(tasks.Job(tasks.Task(block, 0, 0), (), {}))
+        assert started.wait(5)
+        queue.submit(tasks.Job(flaky_task, ('queued', 0), {}))
+        with pytest.raises(tasks.QueueFull):
+            queue.submit(tasks.Job(flaky_task, ('rejected', 0), {}))
+
+        release.set()
+        assert queue.shutdown(5)
+        assert task_calls.count('queued') == 1
+        with pytest.raises(tasks.QueueFull):
+            queue.submit(tasks.Job(flaky_task, ('closed', 0), {}))
+
+    @pytest.mark.django_db
+    def test_delay_waits_for_commit(self, fresh_queue, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks() as callbacks:
+            flaky_task.delay('committed', 0)
+        assert fresh_queue.size() == 0
+
+        for callback in callbacks:
+            callback()
+        assert fresh_queue.drain(5)
+        assert task_calls == ['committed']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_worker_command_runs_database_queue(self, settings):
+        settings.TASK_QUEUE_BACKEND = 'database'
+        flaky_task.delay('ok', 0)
+        flaky_task.delay('broken', 10)
+        BackgroundTask.objects.update(run_after=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+
+        call_command('run_task_worker', '--once', '--poll-interval', '0.01', stdout=out)
+        while BackgroundTask.objects.filter(failed_at__isnull=True).exists():
+            BackgroundTask.objects.update(run_after=timezone.now())
+            call_command('run_task_worker', '--once', '--poll-interval', '0.01', stdout=out)
+
+        failed = BackgroundTask.objects.get()
+        assert (failed.args, failed.attempts) == (['broken', 10], 3)
+        assert failed.last_error == "RuntimeError('broken')"
+        assert task_calls.count('ok') == 1
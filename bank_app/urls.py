@@ -1,7 +1,9 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from . import async_views
 from .views import (
     BankerListClientsView,
+    BankerClientOverviewView,
     BankerRetrieveUpdateDestroyClientView,
     ClientRequestBankAccountView,
     ClientRetrieveBankAccountView,
@@ -14,32 +16,53 @@ from .views import (
     ClientDebitCardRequestInfo,
     ClientDebitCardView,
     TransactionCreateView,
+    BatchTransactionCreateView,
     ClientTransactionListView,
+    ClientStatementView,
     BankerTransactionListView,
+    BankerTransactionExportView,
+    BankerTransferListView,
+    BankerMetricsView,
     WithdrawalCreateView,
     DepositCreateView,
-    BankerListDebitCardsView
+    BankerListDebitCardsView,
+    BankerBulkReviewBankAccountsView,
+    BankerBulkReviewDebitCardRequestsView,
 )
 urlpatterns = [
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('banker/list-clients/', BankerListClientsView.as_view(), name='banker-list-clients'),
+    path('banker/clients/overview/', BankerClientOverviewView.as_view(), name='banker-client-overview'),
     path('banker/client/<int:pk>/', BankerRetrieveUpdateDestroyClientView.as_view(), name='banker-client-detail'),
     path('banker/client/create/', BankerCreateClientView.as_view(), name='banker-client-create'),
     path('client/request-bank-account/', ClientRequestBankAccountView.as_view(), name='client-request-bank-account'),
     path('client/retrieve-bank-account/', ClientRetrieveBankAccountView.as_view(), name='client-retrieve-bank-account'),
     path('banker/list-bank-accounts/', BankerListBankAccountsView.as_view(), name='banker-list-bank-accounts'),
     path('banker/bank-accounts/<int:pk>/', BankerRetrieveUpdateDestroyBankAccountView.as_view(), name='banker-bank-account-detail'),
+    path('banker/bank-accounts/bulk-review/', BankerBulkReviewBankAccountsView.as_view(),
+         name='banker-bulk-review-bank-accounts'),
     path('client/request-debit-card/', ClientRequestDebitCardView.as_view(), name='client-request-debit-card'),
     path('client/debit-card-request-info/', ClientDebitCardRequestInfo.as_view(), name='client-debit-card-requests'),
     path('banker/list-debit-card-requests/', BankerListDebitCardRequestsView.as_view(), name='banker-list-debit-card-requests'),
     path('banker/list-debit-cards/', BankerListDebitCardsView.as_view(), name='banker-list-debit-cards'),
     path('banker/review-debit-card-request/<int:pk>/', BankerReviewDebitCardRequestView.as_view(), name='banker-review-debit-card-request'),
+    path('banker/debit-card-requests/bulk-review/', BankerBulkReviewDebitCardRequestsView.as_view(),
+         name='banker-bulk-review-debit-card-requests'),
     path('client/debit-cards/', ClientDebitCardView.as_view(), name='client-debit-cards'),
     path('transactions/create/', TransactionCreateView.as_view(), name='create-transaction'),
+    path('transactions/batch/', BatchTransactionCreateView.as_view(), name='create-batch-transaction'),
     path('client/transactions/', ClientTransactionListView.as_view(), name='client-transaction-list'),
+    path('client/statement/', ClientStatementView.as_view(), name='client-statement'),
     path('banker/transactions/', BankerTransactionListView.as_view(), name='banker-transaction-list'),
+    path('banker/transactions/export/', BankerTransactionExportView.as_view(), name='banker-transaction-export'),
+    path('banker/transfers/', BankerTransferListView.as_view(), name='banker-transfer-list'),
+    path('banker/metrics/', BankerMetricsView.as_view(), name='banker-metrics'),
     path('client/deposit/', DepositCreateView.as_view(), name='deposit'),
     path('client/withdraw/', WithdrawalCreateView.as_view(), name='withdraw'),
+    path('async/client/retrieve-bank-account/', async_views.client_retrieve_bank_account,
+         name='async-client-retrieve-bank-account'),
+    path('async/client/transactions/', async_views.client_transaction_list, name='async-client-transaction-list'),
+    path('async/client/debit-cards/', async_views.client_debit_cards, name='async-client-debit-cards'),
 
 ]
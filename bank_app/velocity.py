@@ -0,0 +1,166 @@
+import math
+import time
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Transaction
+from .tasks import task
+
+KEY_PREFIX = 'velocity'
+SEEDED_KEY = f'{KEY_PREFIX}:seeded'
+SEEDING_KEY = f'{KEY_PREFIX}:seeding'
+# A failed background seed may be retried by a later request after this long
+SEED_LOCK_SECONDS = 300
+# Each window is tracked as this many buckets, so checks cost the same however
+# busy the account is and the window slides with bucket-sized steps
+BUCKETS_PER_WINDOW = 60
+
+
+class LimitExceeded(Exception):
+    def __init__(self, rule):
+        super().__init__(f"Velocity limit exceeded: {rule.name}.")
+        self.rule = rule
+
+
+class Rule(namedtuple('Rule', 'name kind window max_count max_amount')):
+
+    @property
+    def bucket_seconds(self):
+        return max(1, math.ceil(self.window / BUCKETS_PER_WINDOW))
+
+    @property
+    def bucket_count(self):
+        return math.ceil(self.window / self.bucket_seconds)
+
+
+def rules(kind=None):
+    # settings.VELOCITY_LIMITS: dicts with name, kind ('withdrawal' or 'transfer'),
+    # window in seconds and max_count and/or max_amount in the account currency
+    return [
+        Rule(limit['name'], limit['kind'], int(limit['window']), limit.get('max_count'),
+             Decimal(str(limit['max_amount'])) if limit.get('max_amount') is not None else None)
+        for limit in getattr(settings, 'VELOCITY_LIMITS', [])
+        if kind is None or limit['kind'] == kind
+    ]
+
+
+def _cents(amount):
+    return int(amount * 100)
+
+
+def _keys(rule, account_id, bucket):
+    base = f'{KEY_PREFIX}:{rule.name}:{account_id}:{bucket}'
+    return f'{base}:count', f'{base}:cents'
+
+
+def _incr(key, delta, rule):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, rule.window + rule.bucket_seconds):
+            cache.incr(key, delta)
+
+
+def _decr(key, delta):
+    try:
+        cache.decr(key, delta)
+    except ValueError:
+        pass
+
+
+def _window_totals(rule, account_id, bucket):
+    keys = [_keys(rule, account_id, index) for index in range(bucket - rule.bucket_count + 1, bucket + 1)]
+    values = cache.get_many([key for pair in keys for key in pair])
+    return (sum(values.get(count_key, 0) for count_key, _ in keys),
+            sum(values.get(cents_key, 0) for _, cents_key in keys))
+
+
+def seed(now=None):
+    # Rebuilds the counters from recent debits: transfer legs count as transfers,
+    # other debits as withdrawals. Run at deploy by the seed_velocity_limits command.
+    now = now or time.time()
+    all_rules = rules()
+    if not all_rules:
+        return 0
+    since = timezone.now() - timedelta(seconds=max(rule.window for rule in all_rules))
+    by_kind = defaultdict(list)
+    for rule in all_rules:
+        by_kind[rule.kind].append(rule)
+
+    counters = defaultdict(int)
+    rows = Transaction.objects.filter(created_at__gte=since, transaction_type='DEBIT') \
+        .values_list('bank_account_id', 'amount', 'created_at', 'transfer_id')
+    seeded = 0
+    for account_id, amount, created_at, transfer_id in rows.iterator():
+        timestamp = created_at.timestamp()
+        for rule in by_kind['transfer' if transfer_id else 'withdrawal']:
+            if timestamp < now - rule.window:
+                continue
+            count_key, cents_key = _keys(rule, account_id, int(timestamp // rule.bucket_seconds))
+            counters[count_key] += 1
+            counters[cents_key] += _cents(amount)
+        seeded += 1
+
+    timeout = max(rule.window + rule.bucket_seconds for rule in all_rules)
+    cache.set_many(counters, timeout)
+    cache.set(SEEDED_KEY, True, None)
+    return seeded
+
+
+@task(max_retries=3, backoff=5.0)
+def seed_counters():
+    seed()
+
+
+def _ensure_seeded():
+    # Only a cache read on the request path. If the counters were lost (cache
+    # restart, or no seed at deploy), one process queues a background reseed;
+    # until it lands, limits only count movements made since.
+    if cache.get(SEEDED_KEY) is None and cache.add(SEEDING_KEY, True, SEED_LOCK_SECONDS):
+        seed_counters.delay()
+
+
+class Reservation:
+    def __init__(self):
+        self.applied = []
+
+    def release(self):
+        for key, delta in self.applied:
+            _decr(key, delta)
+        self.applied = []
+
+
+def reserve(account_id, kind, amount, count=1):
+    # Counts the movement first and checks afterwards, so concurrent requests
+    # cannot all slip under a limit; a rejected movement is taken back out
+    kind_rules = rules(kind)
+    reservation = Reservation()
+    if not kind_rules:
+        return reservation
+    _ensure_seeded()
+
+    now = time.time()
+    cents = _cents(amount)
+    try:
+        for rule in kind_rules:
+            bucket = int(now // rule.bucket_seconds)
+            count_key, cents_key = _keys(rule, account_id, bucket)
+            _incr(count_key, count, rule)
+            _incr(cents_key, cents, rule)
+            reservation.applied += [(count_key, count), (cents_key, cents)]
+
+            total_count, total_cents = _window_totals(rule, account_id, bucket)
+            if rule.max_count is not None and total_count > rule.max_count:
+                raise LimitExceeded(rule)
+            if rule.max_amount is not None and total_cents > _cents(rule.max_amount):
+                raise LimitExceeded(rule)
+    except LimitExceeded:
+        reservation.release()
+        raise
+    return reservation
+
@@ -1,4 +1,9 @@
-from datetime import timedelta
+from datetime import datetime, time, timedelta
+from itertools import chain
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.response import Response
@@ -6,23 +11,53 @@ from rest_framework.permissions import IsAuthenticated
 from .models import CustomUser
 from .serializers import CustomUserSerializer
 from .permissions import IsBankerPermission
-from .models import BankAccount, DebitCard, DebitCardRequest, Transaction
+from .models import ArchivedTransaction, BankAccount, DebitCard, DebitCardRequest, Transaction, Transfer
 from .serializers import BankAccountRequestSerializer, BankAccountSerializer, DebitCardSerializer, \
-    DebitCardRequestSerializer, TransactionSerializer
+    DebitCardRequestSerializer, TransactionSerializer, StatementLineSerializer, TransferSerializer, \
+    ClientOverviewSerializer
 from .permissions import IsClientPermission
-import uuid
+from .pagination import TransactionCursorPagination
+from .exports import EXPORT_FORMATS, iter_transaction_rows
+from .statements import build_statement
+from .idempotency import IdempotentCreateMixin
+from .archive import transaction_history
+from .routers import ReplicaReadMixin, read_database
+from .fast_serializers import BankAccountValuesSerializer, DebitCardValuesSerializer, TransactionValuesSerializer, \
+    ValuesListMixin
+from .identifiers import generate_unique_account_id, generate_unique_iban, generate_unique_card_number, \
+    calculate_expiration_date
 from rest_framework import serializers
-from decimal import Decimal
 from django.contrib.auth.hashers import make_password
-from django.db import transaction
+from . import eligibility, fx, metrics, services
+from .reviews import MAX_BULK_REVIEW, MIN_DEBIT_CARD_SALARY, pending_debit_card_requests, review_bank_accounts, \
+    review_debit_card_requests
 
 
-class BankerListClientsView(generics.ListAPIView):
+class BankerListClientsView(ReplicaReadMixin, generics.ListAPIView):
     queryset = CustomUser.objects.filter(is_client=True)
     serializer_class = CustomUserSerializer
     permission_classes = [IsBankerPermission]
 
 
+class BankerClientOverviewView(ReplicaReadMixin, generics.ListAPIView):
+    serializer_class = ClientOverviewSerializer
+    permission_classes = [IsBankerPermission]
+
+    def get_queryset(self):
+        # One query for clients with their account and card, one per prefetch,
+        # however many clients there are
+        last_transaction = Transaction.objects.filter(bank_account__user=OuterRef('pk')).order_by('-created_at')
+        last_archived = ArchivedTransaction.objects.filter(bank_account__user=OuterRef('pk')).order_by('-created_at')
+        pending = Q(debitcardrequest__is_approved=False, debitcardrequest__rejection_reason__isnull=True)
+        return CustomUser.objects.filter(is_client=True) \
+            .select_related('bank_account__debitcard') \
+            .prefetch_related('bank_account__shards') \
+            .annotate(pending_card_requests=Count('debitcardrequest', filter=pending),
+                      last_transaction_at=Coalesce(Subquery(last_transaction.values('created_at')[:1]),
+                                                   Subquery(last_archived.values('created_at')[:1]))) \
+            .order_by('id')
+
+
 class BankerCreateClientView(generics.CreateAPIView):
     queryset = CustomUser.objects.filter(is_client=True)
     serializer_class = CustomUserSerializer
@@ -87,7 +122,7 @@ class ClientRequestBankAccountView(generics.CreateAPIView):
     permission_classes = [IsClientPermission]
 
     def perform_create(self, serializer):
-        existing_account = BankAccount.objects.filter(user=self.request.user)
+        existing_account = BankAccount.objects.filter(user_id=self.request.user.pk)
 
         if existing_account:
             raise serializers.ValidationError("You already have a bank account.")
@@ -95,29 +130,22 @@ class ClientRequestBankAccountView(generics.CreateAPIView):
         account_id = generate_unique_account_id()
         iban = generate_unique_iban()
 
-        serializer.save(user=self.request.user, account_id=account_id, iban=iban)
+        serializer.save(user_id=self.request.user.pk, account_id=account_id, iban=iban)
         return Response({'detail': 'Bank account request submitted for approval.'}, status=status.HTTP_201_CREATED)
 
 
-def generate_unique_account_id():
-    return 'ACCT_' + str(uuid.uuid4().hex)[:8]
-
-
-def generate_unique_iban():
-    return 'IBAN_' + str(uuid.uuid4().hex)[:12]
-
-
-class ClientRetrieveBankAccountView(generics.RetrieveAPIView):
+class ClientRetrieveBankAccountView(ReplicaReadMixin, generics.RetrieveAPIView):
     serializer_class = BankAccountSerializer
     permission_classes = [IsClientPermission]
 
     def get_object(self):
-        return BankAccount.objects.get(user=self.request.user)
+        return BankAccount.objects.get(user_id=self.request.user.pk)
 
 
-class BankerListBankAccountsView(generics.ListAPIView):
+class BankerListBankAccountsView(ReplicaReadMixin, ValuesListMixin, generics.ListAPIView):
     queryset = BankAccount.objects.all()
     serializer_class = BankAccountSerializer
+    values_serializer_class = BankAccountValuesSerializer
     permission_classes = [IsBankerPermission]
 
 
@@ -141,12 +169,13 @@ class ClientRequestDebitCardView(generics.CreateAPIView):
     def perform_create(self, serializer):
         client = self.request.user
 
-        existing_request = DebitCardRequest.objects.filter(client=client, is_approved=False).first()
+        existing_request = DebitCardRequest.objects.filter(client_id=client.pk, is_approved=False,
+                                                           rejection_reason__isnull=True).first()
         if existing_request:
             raise serializers.ValidationError("You have already made a debit card request. Please wait for approval.")
 
         # Check if the associated bank account is approved
-        bank_account = BankAccount.objects.get(user=client)
+        bank_account = BankAccount.objects.get(user_id=client.pk)
         if not bank_account.is_approved:
             raise serializers.ValidationError("Bank account must be approved to request a debit card.")
 
@@ -157,22 +186,22 @@ class ClientRequestDebitCardView(generics.CreateAPIView):
 
         # Check if the client's salary is less than 500 euros
         salary = serializer.validated_data.get('monthly_salary', 0)
-        if salary < 500:
+        if salary < MIN_DEBIT_CARD_SALARY:
             raise serializers.ValidationError("Salary must be at least 500 euros to request a debit card.")
 
-        serializer.save(client=client)
+        serializer.save(client_id=client.pk)
 
         return Response({'detail': 'Debit card request submitted for approval.'}, status=status.HTTP_201_CREATED)
 
 
-class ClientDebitCardRequestInfo(generics.ListAPIView):
+class ClientDebitCardRequestInfo(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = DebitCardRequestSerializer
     permission_classes = [IsClientPermission]
 
     def get_queryset(self):
         # Retrieve the debit card requests for the authenticated client
         client = self.request.user
-        return DebitCardRequest.objects.filter(client=client)
+        return DebitCardRequest.objects.filter(client_id=client.pk)
 
 
 class BankerReviewDebitCardRequestView(generics.RetrieveUpdateAPIView):
@@ -181,8 +210,8 @@ class BankerReviewDebitCardRequestView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsBankerPermission]
 
     def perform_update(self, serializer):
-        # Retrieve the existing instance
-        instance = self.get_object()
+        # The instance was already loaded by update(); don't fetch it a second time
+        instance = serializer.instance
 
         # If the request is approved, create a new DebitCard instance
         if serializer.validated_data.get('is_approved', False):
@@ -202,34 +231,77 @@ class BankerReviewDebitCardRequestView(generics.RetrieveUpdateAPIView):
         serializer.save()
 
 
-def generate_unique_card_number():
-    return 'CARD_' + str(uuid.uuid4().hex)[:10]
+def _is_id(value):
+    # bool is a subclass of int, but true/false are not ids
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _parse_id_list(value):
+    if not isinstance(value, list) or not value:
+        raise serializers.ValidationError("A non-empty list of ids is required.")
+    if len(value) > MAX_BULK_REVIEW:
+        raise serializers.ValidationError(f"At most {MAX_BULK_REVIEW} items are allowed per request.")
+    if not all(_is_id(pk) for pk in value):
+        raise serializers.ValidationError("Ids must be integers.")
+    return value
 
 
-def calculate_expiration_date():
-    return timezone.now() + timedelta(days=365)
+class BankerBulkReviewBankAccountsView(generics.GenericAPIView):
+    permission_classes = [IsBankerPermission]
+
+    def post(self, request, *args, **kwargs):
+        ids = _parse_id_list(request.data.get('ids'))
+        is_approved = request.data.get('is_approved', True)
+        if not isinstance(is_approved, bool):
+            raise serializers.ValidationError("is_approved must be a boolean.")
 
+        return Response({'results': review_bank_accounts(ids, is_approved)}, status=status.HTTP_200_OK)
 
-class BankerListDebitCardRequestsView(generics.ListAPIView):
-    queryset = DebitCardRequest.objects.filter(is_approved=False)
+
+class BankerBulkReviewDebitCardRequestsView(generics.GenericAPIView):
+    permission_classes = [IsBankerPermission]
+
+    def post(self, request, *args, **kwargs):
+        decisions = request.data.get('decisions')
+        if not isinstance(decisions, list) or not decisions:
+            raise serializers.ValidationError("A non-empty list of decisions is required.")
+        if len(decisions) > MAX_BULK_REVIEW:
+            raise serializers.ValidationError(f"At most {MAX_BULK_REVIEW} items are allowed per request.")
+
+        parsed = []
+        for decision in decisions:
+            if not isinstance(decision, dict) or not _is_id(decision.get('id')) \
+                    or not isinstance(decision.get('is_approved'), bool):
+                raise serializers.ValidationError("Each decision needs an integer id and a boolean is_approved.")
+            reason = decision.get('rejection_reason')
+            if reason is not None and not (isinstance(reason, str) and reason.strip()):
+                raise serializers.ValidationError("rejection_reason must be a non-empty string.")
+            parsed.append((decision['id'], decision['is_approved'], decision.get('rejection_reason')))
+
+        return Response({'results': review_debit_card_requests(parsed)}, status=status.HTTP_200_OK)
+
+
+class BankerListDebitCardRequestsView(ReplicaReadMixin, generics.ListAPIView):
+    queryset = pending_debit_card_requests()
     serializer_class = DebitCardRequestSerializer
     permission_classes = [IsBankerPermission]
 
 
-class BankerListDebitCardsView(generics.ListAPIView):
+class BankerListDebitCardsView(ReplicaReadMixin, ValuesListMixin, generics.ListAPIView):
     queryset = DebitCard.objects.all()
     serializer_class = DebitCardSerializer
+    values_serializer_class = DebitCardValuesSerializer
     permission_classes = [IsBankerPermission]
 
 
-class ClientDebitCardView(generics.ListAPIView):
+class ClientDebitCardView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = DebitCardSerializer
     permission_classes = [IsClientPermission]
 
     def get_queryset(self):
         # Retrieve the credit cards for the authenticated client
         client = self.request.user
-        return DebitCard.objects.filter(connected_account__user=client)
+        return DebitCard.objects.filter(connected_account__user_id=client.pk)
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -242,7 +314,7 @@ class ClientDebitCardView(generics.ListAPIView):
         return Response(serializer.data)
 
 
-class TransactionCreateView(generics.CreateAPIView):
+class TransactionCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [IsClientPermission]
 
@@ -260,70 +332,225 @@ class TransactionCreateView(generics.CreateAPIView):
 
         try:
             # Retrieve sender's bank account
-            sender_account = BankAccount.objects.get(user=client)
-            if not DebitCard.objects.filter(connected_account=sender_account, is_approved=True).exists():
+            sender = eligibility.get_account_for_user(client.pk)
+            if not sender.has_approved_card:
                 return Response({"detail": "You must have an approved debit card to perform a transaction."},
                                 status=status.HTTP_400_BAD_REQUEST)
 
             # Retrieve receiver's bank account
-            receiver_account = BankAccount.objects.get(iban=receiver_iban)
-            if not DebitCard.objects.filter(connected_account=receiver_account, is_approved=True).exists():
+            receiver = eligibility.get_account_for_iban(receiver_iban)
+            if not receiver.has_approved_card:
                 return Response({"detail": "The receiver must have an approved debit card to perform a transaction."},
                                 status=status.HTTP_400_BAD_REQUEST)
 
-            # Check if there's enough balance in the sender's account
-            if sender_account.balance < float(amount):
-                return Response({"detail": "Insufficient balance in the sender's account."},
-                                status=status.HTTP_400_BAD_REQUEST)
-            with transaction.atomic():
-                sender_account.balance -= Decimal(amount)
-                receiver_account.balance += Decimal(amount)
-                sender_account.save()
-                receiver_account.save()
-            # Perform the transaction
-                Transaction.objects.create(
-                    bank_account=sender_account,
-                    amount=amount,
-                    currency="EUR",
-                    transaction_type="DEBIT"
-                )
-                # Create a credit transaction for the receiver's account
-                Transaction.objects.create(
-                    bank_account=receiver_account,
-                    amount=amount,
-                    currency="EUR",
-                    transaction_type="CREDIT"
-                )
-            # Update the sender's account balance
+            # Move the money; the balance check happens inside the locked update
+            services.transfer(sender.as_account(), receiver.as_account(), amount)
 
             return Response({"The Transaction is successful"}, status=status.HTTP_201_CREATED)
 
         except BankAccount.DoesNotExist:
             return Response({"detail": "Invalid receiver IBAN."}, status=status.HTTP_400_BAD_REQUEST)
+        except services.TransferError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+MAX_BATCH_TRANSFERS = 1000
+
+
+class BatchTransactionCreateView(IdempotentCreateMixin, generics.CreateAPIView):
+    serializer_class = TransactionSerializer
+    permission_classes = [IsClientPermission]
+
+    def create(self, request, *args, **kwargs):
+        client = request.user
+        transfers = request.data.get('transfers', None)
 
+        if not isinstance(transfers, list) or not transfers:
+            return Response({"detail": "A non-empty list of transfers is required."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(transfers) > MAX_BATCH_TRANSFERS:
+            return Response({"detail": f"At most {MAX_BATCH_TRANSFERS} transfers are allowed per batch."},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-class ClientTransactionListView(generics.ListAPIView):
+        try:
+            sender = eligibility.get_account_for_user(client.pk)
+        except BankAccount.DoesNotExist:
+            return Response({"detail": "Invalid bank account."}, status=status.HTTP_400_BAD_REQUEST)
+        if not sender.has_approved_card:
+            return Response({"detail": "You must have an approved debit card to perform a transaction."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        sender_account = sender.as_account()
+
+        # Shape checks come first: only string IBANs are hashed and looked up below
+        valid = []
+        errors = []
+        for index, leg in enumerate(transfers):
+            if not isinstance(leg, dict) or not leg.get('receiver_iban') or not leg.get('amount'):
+                errors.append({"index": index, "detail": "Receiver IBAN and amount are required."})
+            elif not isinstance(leg['receiver_iban'], str):
+                errors.append({"index": index, "detail": "Receiver IBAN must be a string."})
+            else:
+                valid.append((index, leg))
+
+        # Resolve every receiver IBAN with its card eligibility: cache first, one query for the misses
+        receivers = eligibility.get_accounts_for_ibans({leg['receiver_iban'] for _, leg in valid})
+
+        legs = []
+        for index, leg in valid:
+            receiver = receivers.get(leg['receiver_iban'])
+            if receiver is None or not receiver.has_approved_card:
+                errors.append({"index": index,
+                               "detail": "Invalid receiver IBAN or the receiver has no approved debit card."})
+                continue
+            receiver_account = receiver.as_account()
+            if receiver_account.pk == sender_account.pk:
+                errors.append({"index": index, "detail": "Sender and receiver accounts must be different."})
+                continue
+            try:
+                legs.append((receiver_account, services.parse_amount(leg['amount'])))
+            except services.InvalidAmount as exc:
+                errors.append({"index": index, "detail": str(exc)})
+
+        # The batch is applied all-or-nothing, so any invalid leg rejects the whole request
+        if errors:
+            errors.sort(key=lambda error: error['index'])
+            return Response({"detail": "The batch contains invalid transfers.", "errors": errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            total = services.batch_transfer(sender_account, legs)
+        except services.TransferError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"detail": "The batch transaction is successful.", "count": len(legs), "total": str(total)},
+                        status=status.HTTP_201_CREATED)
+
+
+class ClientTransactionListView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [IsClientPermission]
+    pagination_class = TransactionCursorPagination
 
     def get_queryset(self):
         # Retrieve the authenticated client
         client = self.request.user
+        start = parse_date_bound(self.request.query_params.get('start'))
+        end = parse_date_bound(self.request.query_params.get('end'), end=True)
 
-        # Retrieve transactions for the authenticated client
-        return Transaction.objects.filter(bank_account__user=client)
+        # Retrieve transactions for the authenticated client, archived ones only if the range reaches them
+        return transaction_history(start, end, bank_account__user_id=client.pk)
 
 
-class BankerTransactionListView(generics.ListAPIView):
+class BankerTransactionListView(ReplicaReadMixin, ValuesListMixin, generics.ListAPIView):
     serializer_class = TransactionSerializer
+    values_serializer_class = TransactionValuesSerializer
     permission_classes = [IsBankerPermission]
+    pagination_class = TransactionCursorPagination
 
     def get_queryset(self):
         # Retrieve all transactions for the banker
-        return Transaction.objects.all()
+        start = parse_date_bound(self.request.query_params.get('start'))
+        end = parse_date_bound(self.request.query_params.get('end'), end=True)
+        return transaction_history(start, end)
 
 
-class WithdrawalCreateView(generics.CreateAPIView):
+class BankerTransferListView(ReplicaReadMixin, generics.ListAPIView):
+    serializer_class = TransferSerializer
+    permission_classes = [IsBankerPermission]
+    pagination_class = TransactionCursorPagination
+
+    def get_queryset(self):
+        # Who paid whom: each filter maps onto the transfer counterparty indexes
+        queryset = Transfer.objects.select_related('debit_account', 'credit_account')
+        payer_iban = self.request.query_params.get('payer_iban')
+        payee_iban = self.request.query_params.get('payee_iban')
+
+        if payer_iban:
+            queryset = queryset.filter(debit_account__iban=payer_iban)
+        if payee_iban:
+            queryset = queryset.filter(credit_account__iban=payee_iban)
+        return queryset
+
+
+def parse_date_bound(value, end=False):
+    # Accept either a date or a datetime; a bare end date includes that whole day
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise serializers.ValidationError(f"Invalid date: {value}")
+        if end:
+            day += timedelta(days=1)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class BankerTransactionExportView(ReplicaReadMixin, generics.GenericAPIView):
+    permission_classes = [IsBankerPermission]
+
+    def get_queryset(self):
+        start = parse_date_bound(self.request.query_params.get('start'))
+        end = parse_date_bound(self.request.query_params.get('end'), end=True)
+        iban = self.request.query_params.get('iban')
+
+        filters = {'bank_account__iban': iban} if iban else {}
+        return transaction_history(start, end, **filters)
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"detail": "Export format must be one of: csv, ndjson."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        stream, content_type = EXPORT_FORMATS[export_format]
+        # Archived rows first; each table is walked on its own id range. The rows are
+        # streamed after the view returns, so pin the database chosen for this request.
+        database = read_database()
+        rows = chain.from_iterable(iter_transaction_rows(queryset.using(database))
+                                   for queryset in self.get_queryset().querysets)
+        response = StreamingHttpResponse(stream(rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="transactions.{export_format}"'
+        return response
+
+
+class ClientStatementView(ReplicaReadMixin, generics.GenericAPIView):
+    serializer_class = StatementLineSerializer
+    permission_classes = [IsClientPermission]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            bank_account = BankAccount.objects.get(user_id=request.user.pk)
+        except BankAccount.DoesNotExist:
+            return Response({"detail": "Invalid bank account."}, status=status.HTTP_400_BAD_REQUEST)
+
+        start = parse_date_bound(request.query_params.get('start'))
+        end = parse_date_bound(request.query_params.get('end'), end=True)
+        currency = request.query_params.get('currency')
+        try:
+            statement = build_statement(bank_account, start, end, currency=currency.upper() if currency else None)
+        except fx.UnknownCurrency as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'iban': bank_account.iban,
+            'currency': statement['currency'],
+            'start': start,
+            'end': end,
+            'opening_balance': str(statement['opening_balance']),
+            'closing_balance': str(statement['closing_balance']),
+            'totals': {
+                transaction_type: {'total': str(values['total']), 'count': values['count']}
+                for transaction_type, values in statement['totals'].items()
+            },
+            'lines': self.get_serializer(statement['lines'], many=True).data,
+        })
+
+
+class WithdrawalCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [IsClientPermission]
 
@@ -340,36 +567,24 @@ class WithdrawalCreateView(generics.CreateAPIView):
 
         try:
             # Retrieve sender's bank account
-            sender_account = BankAccount.objects.get(user=client)
+            sender = eligibility.get_account_for_user(client.pk)
 
             # Check if the sender has a debit card
-            if not DebitCard.objects.filter(connected_account=sender_account, is_approved=True).exists():
+            if not sender.has_approved_card:
                 return Response({"detail": "You must have an approved debit card to perform a withdrawal."},
                                 status=status.HTTP_400_BAD_REQUEST)
 
-            # Check if there's enough balance in the sender's account
-            if sender_account.balance < float(amount):
-                return Response({"detail": "Insufficient balance in the sender's account."},
-                                status=status.HTTP_400_BAD_REQUEST)
-
-            sender_account.balance -= Decimal(amount)
-            sender_account.save()
-
-            # Perform the withdrawal transaction
-            Transaction.objects.create(
-                bank_account=sender_account,
-                amount=amount,
-                currency="EUR",
-                transaction_type="DEBIT",
-            )
+            services.withdraw(sender.as_account(), amount)
 
             return Response({"detail": "Withdrawal is successful"}, status=status.HTTP_201_CREATED)
 
         except BankAccount.DoesNotExist:
             return Response({"detail": "Invalid bank account."}, status=status.HTTP_400_BAD_REQUEST)
+        except services.TransferError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class DepositCreateView(generics.CreateAPIView):
+class DepositCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [IsClientPermission]
 
@@ -386,25 +601,26 @@ class DepositCreateView(generics.CreateAPIView):
 
         try:
             # Retrieve sender's bank account
-            sender_account = BankAccount.objects.get(user=client)
+            sender = eligibility.get_account_for_user(client.pk)
 
             # Check if the sender has a debit card
-            if not DebitCard.objects.filter(connected_account=sender_account, is_approved=True).exists():
+            if not sender.has_approved_card:
                 return Response({"detail": "You must have an approved debit card to perform a deposit."},
                                 status=status.HTTP_400_BAD_REQUEST)
 
-            sender_account.balance += Decimal(amount)
-            sender_account.save()
-
-            # Perform the deposit transaction
-            Transaction.objects.create(
-                bank_account=sender_account,
-                amount=amount,
-                currency="EUR",
-                transaction_type="CREDIT",
-            )
+            services.deposit(sender.as_account(), amount)
 
             return Response({"detail": "Deposit is successful"}, status=status.HTTP_201_CREATED)
 
         except BankAccount.DoesNotExist:
             return Response({"detail": "Invalid bank account."}, status=status.HTTP_400_BAD_REQUEST)
+        except services.TransferError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BankerMetricsView(generics.GenericAPIView):
+    permission_classes = [IsBankerPermission]
+
+    def get(self, request, *args, **kwargs):
+        # Prometheus text exposition of the metrics recorded in this process
+        return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
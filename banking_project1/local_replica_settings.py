@@ -0,0 +1,19 @@
+# Two SQLite files standing in for the MySQL primary and its read replica, to try
+# the database router locally. Nothing replicates between them: copy primary.sqlite3
+# over replica.sqlite3 to catch the replica up.
+#   python manage.py migrate --settings=banking_project1.local_replica_settings
+#   python manage.py migrate --database=replica --settings=banking_project1.local_replica_settings
+#   pytest --ds=banking_project1.local_replica_settings
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'primary.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+    },
+}
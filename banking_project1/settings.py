@@ -44,7 +44,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'bank_app.authentication.StatelessJWTAuthentication',
     ),
 }
 
@@ -52,9 +52,28 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'bank_app.authentication.BankTokenObtainPairSerializer',
 }
 
+# Re-check token users against the database (cached per user for the TTL in seconds).
+# Costs one indexed query per user per TTL. Without it, a deactivated user or a
+# changed role keeps working until the access token expires, up to a full
+# ACCESS_TOKEN_LIFETIME; only turn it off together with a much shorter lifetime.
+JWT_REVOCATION_CHECK = True
+JWT_REVOCATION_CACHE_TTL = 60
+
+# How long (in seconds) a stored Idempotency-Key response can be replayed
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Identifier allocation: values reserved per round trip, and the fixed parts of IBANs and card numbers
+IDENTIFIER_BLOCK_SIZE = 100
+IBAN_COUNTRY_CODE = 'AL'
+IBAN_BANK_CODE = '00000000'
+CARD_IIN = '400000'
+
 MIDDLEWARE = [
+    'bank_app.middleware.MetricsMiddleware',
+    'bank_app.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -107,6 +126,25 @@ DATABASES = {
     }
 }
 
+# Shared by every worker process, so invalidating an eligibility entry, a revoked token,
+# replica stickiness or the FX rate version takes effect everywhere at once, and velocity
+# counters add up across workers. A per-process LocMemCache would leave the other workers
+# serving stale entries until they expire.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379/0',
+        'KEY_PREFIX': 'bank',
+    }
+}
+
+# Read-only views use DATABASES[REPLICA_DATABASE_ALIAS] when it is configured, e.g.
+#   DATABASES['replica'] = {**DATABASES['default'], 'HOST': 'replica.internal'}
+# A user who wrote stays on the primary for REPLICA_STICKY_SECONDS (longer than the replica lag).
+DATABASE_ROUTERS = ['bank_app.routers.PrimaryReplicaRouter']
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_STICKY_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -148,3 +186,28 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Exchange rates are stored against FX_BASE_CURRENCY and cached in-process for FX_RATE_CACHE_TTL seconds
+FX_BASE_CURRENCY = 'EUR'
+FX_RATE_CACHE_TTL = 60
+
+# Per-account sliding-window limits, counted in the shared cache. Amounts are in the account currency.
+# Run `manage.py seed_velocity_limits` at deploy to rebuild the counters from recent debits.
+VELOCITY_LIMITS = [
+    {'name': 'withdrawals-per-hour', 'kind': 'withdrawal', 'window': 60 * 60, 'max_count': 20},
+    {'name': 'withdrawn-per-day', 'kind': 'withdrawal', 'window': 24 * 60 * 60, 'max_amount': '10000.00'},
+    {'name': 'transferred-per-day', 'kind': 'transfer', 'window': 24 * 60 * 60, 'max_amount': '50000.00'},
+]
+
+# Post-commit side effects (bank_app.tasks): 'thread' runs them on a bounded pool in
+# each web process, 'database' queues them for `manage.py run_task_worker`
+TASK_QUEUE_BACKEND = 'thread'
+TASK_QUEUE_WORKERS = 4
+TASK_QUEUE_MAX_SIZE = 1000
+TASK_QUEUE_DRAIN_SECONDS = 10
+
+# Closed months kept in the hot transaction table by archive_transactions
+TRANSACTION_HOT_MONTHS = 12
+
+# Fraction of requests recorded by bank_app.middleware.MetricsMiddleware (0 disables it)
+METRICS_SAMPLE_RATE = 1.0
@@ -0,0 +1,84 @@
+"""Compare the sync (WSGI) and async (ASGI) client read endpoints.
+
+    python -m benchmarks.async_reads --clients 20 --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.harness import add_database_argument, benchmark_database, emit, environment, seed, setup, summarize
+
+ENDPOINTS = [
+    ('retrieve-bank-account', 'client-retrieve-bank-account', 'async-client-retrieve-bank-account'),
+    ('transactions', 'client-transaction-list', 'async-client-transaction-list'),
+    ('debit-cards', 'client-debit-cards', 'async-client-debit-cards'),
+]
+
+
+def run_wsgi(url, tokens, requests, concurrency):
+    from django.test import Client
+
+    client = Client()
+    headers = [{'Authorization': f'Bearer {token}'} for token in tokens]
+
+    def call(index):
+        start = time.perf_counter()
+        status_code = client.get(url, headers=headers[index % len(headers)]).status_code
+        return time.perf_counter() - start, status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, range(requests)))
+    elapsed = time.perf_counter() - start
+    return summarize([latency for latency, _ in results], elapsed,
+                     errors=sum(1 for _, code in results if code >= 400))
+
+
+async def run_asgi(url, tokens, requests, concurrency):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    # Headers go on each request: AsyncClient(headers=...) does not reach the ASGI scope in Django 4.2
+    headers = [{'Authorization': f'Bearer {token}'} for token in tokens]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(index):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(url, headers=headers[index % len(headers)])
+            return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call(index) for index in range(requests)))
+    elapsed = time.perf_counter() - start
+    return summarize([latency for latency, _ in results], elapsed,
+                     errors=sum(1 for _, code in results if code >= 400))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--transactions-per-client', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    add_database_argument(parser)
+    args = parser.parse_args()
+    setup(args.database)
+
+    from django.urls import reverse
+
+    with benchmark_database():
+        tokens = [token for _, _, token in seed(args.clients, args.transactions_per_client)]
+        report = {'parameters': vars(args), 'environment': environment(), 'endpoints': {}}
+        for name, sync_name, async_name in ENDPOINTS:
+            report['endpoints'][name] = {
+                'wsgi': run_wsgi(reverse(sync_name), tokens, args.requests, args.concurrency),
+                'asgi': asyncio.run(run_asgi(reverse(async_name), tokens, args.requests, args.concurrency)),
+            }
+    emit(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
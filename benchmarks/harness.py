@@ -0,0 +1,149 @@
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+
+# Allow running as `python -m benchmarks.<name>` from the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'banking_project1.settings')
+
+DATABASE_CHOICES = ('sqlite', 'settings')
+
+
+def add_database_argument(parser):
+    parser.add_argument('--database', choices=DATABASE_CHOICES, default='sqlite',
+                        help="'sqlite' uses a throwaway SQLite file; 'settings' uses a test copy of "
+                             "the configured database (e.g. a local MySQL)")
+
+
+def setup(database='sqlite', velocity_limits=False):
+    # Must run before anything touches the ORM
+    import django
+    from django.conf import settings
+
+    if not velocity_limits:
+        # Simulated clients move money far faster than the per-account limits allow,
+        # so with them on most requests would be measured as rejections
+        settings.VELOCITY_LIMITS = []
+
+    if database == 'sqlite':
+        path = os.path.join(tempfile.mkdtemp(prefix='bank-bench-'), 'bench.sqlite3')
+        settings.DATABASES['default'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'OPTIONS': {'timeout': 30},
+            'TEST': {'NAME': path},
+        }
+        # Everything runs in this one process, so a local cache stands in for Redis
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    settings.ALLOWED_HOSTS = ['*']
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    # Benchmarks always run against a throwaway test database, never the real one
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed(clients=10, transactions_per_client=100, balance=Decimal('1000000.00')):
+    # Clients with approved accounts and cards, plus some history; returns
+    # (user, account, access token) triples
+    from bank_app.authentication import BankTokenObtainPairSerializer
+    from bank_app.models import BankAccount, CustomUser, DebitCard, Transaction
+
+    users = CustomUser.objects.bulk_create([
+        CustomUser(username=f'bench_client_{index}', is_client=True) for index in range(clients)
+    ])
+    # Not every backend returns primary keys from bulk_create
+    users = list(CustomUser.objects.filter(username__startswith='bench_client_').order_by('id'))
+    BankAccount.objects.bulk_create([
+        BankAccount(user=user, account_id=f'ACCT_B{index:07d}', iban=f'IBAN_BENCH{index:08d}',
+                    balance=balance, is_approved=True)
+        for index, user in enumerate(users)
+    ])
+    accounts = list(BankAccount.objects.filter(user__in=users).order_by('user_id'))
+    DebitCard.objects.bulk_create([
+        DebitCard(card_number=f'{index:016d}', expiration_date='2099-12-31', connected_account=account,
+                  is_approved=True)
+        for index, account in enumerate(accounts)
+    ])
+    Transaction.objects.bulk_create([
+        Transaction(bank_account=account, amount=Decimal('1.00'), currency='EUR',
+                    transaction_type='CREDIT' if index % 2 else 'DEBIT')
+        for account in accounts
+        for index in range(transactions_per_client)
+    ], batch_size=1000)
+
+    return [
+        (user, account, str(BankTokenObtainPairSerializer.get_token(user).access_token))
+        for user, account in zip(users, accounts)
+    ]
+
+
+class QueryCounter:
+    # Installed with connection.execute_wrapper in each worker thread
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, errors=0, queries=None):
+    # Latencies in seconds in, milliseconds out
+    ordered = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+    }
+    if queries is not None:
+        summary['queries_per_request'] = round(queries / len(latencies), 2) if latencies else 0.0
+    return summary
+
+
+def environment():
+    from django.db import connection
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': connection.vendor,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def emit(report, output=None):
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        Path(output).write_text(text + '\n')
+    print(text)
@@ -0,0 +1,76 @@
+"""Compare ModelSerializer and values()-based serialization for the banker list endpoints.
+
+    python -m benchmarks.list_serializers --sizes 10000 100000 --repeat 3
+
+Each run fetches, serializes and renders the same rows both ways, checks the JSON
+is byte-identical, and reports the best time of each path and the speedup.
+"""
+import argparse
+import time
+
+from benchmarks.harness import add_database_argument, benchmark_database, emit, environment, seed, setup
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def compare(model_serializer, values_serializer, queryset, repeat):
+    from rest_framework.renderers import JSONRenderer
+
+    renderer = JSONRenderer()
+    model_seconds, model_json = best_of(repeat, lambda: renderer.render(model_serializer(queryset, many=True).data))
+    values_seconds, values_json = best_of(repeat, lambda: renderer.render(
+        values_serializer().to_representation(values_serializer().get_rows(queryset))))
+    if model_json != values_json:
+        raise SystemExit(f'{model_serializer.__name__}: JSON output differs')
+    return {
+        'rows': queryset.count(),
+        'bytes': len(model_json),
+        'model_serializer_s': round(model_seconds, 4),
+        'values_serializer_s': round(values_seconds, 4),
+        'speedup': round(model_seconds / values_seconds, 2) if values_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    add_database_argument(parser)
+    args = parser.parse_args()
+    setup(args.database)
+
+    from bank_app.fast_serializers import (
+        BankAccountValuesSerializer, DebitCardValuesSerializer, TransactionValuesSerializer,
+    )
+    from bank_app.models import BankAccount, DebitCard, Transaction
+    from bank_app.serializers import BankAccountSerializer, DebitCardSerializer, TransactionSerializer
+
+    endpoints = [
+        ('bank-accounts', BankAccountSerializer, BankAccountValuesSerializer, BankAccount),
+        ('debit-cards', DebitCardSerializer, DebitCardValuesSerializer, DebitCard),
+        ('transactions', TransactionSerializer, TransactionValuesSerializer, Transaction),
+    ]
+
+    with benchmark_database():
+        # One account, card and transaction per client covers every size
+        seed(clients=max(args.sizes), transactions_per_client=1)
+        report = {'parameters': vars(args), 'environment': environment(), 'endpoints': {}}
+        for name, model_serializer, values_serializer, model in endpoints:
+            report['endpoints'][name] = {
+                str(size): compare(model_serializer, values_serializer,
+                                   model.objects.order_by('pk')[:size], args.repeat)
+                for size in args.sizes
+            }
+    emit(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
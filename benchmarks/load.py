@@ -0,0 +1,136 @@
+"""Drive the money-moving and history endpoints with concurrent simulated clients.
+
+    python -m benchmarks.load --clients 20 --requests-per-client 50 --output bench.json
+    python -m benchmarks.load --database settings --scenario transfer
+
+Each scenario reports throughput, p50/p95/p99 latency and queries per request as
+JSON, so reports from two releases can be diffed directly. Velocity limits are off
+unless --velocity-limits is given; requests they reject are then counted apart from
+errors.
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.harness import (
+    QueryCounter, add_database_argument, benchmark_database, emit, environment, seed, setup, summarize,
+)
+
+
+def transfer(accounts, index):
+    receiver = accounts[(index + 1) % len(accounts)]
+    return 'post', 'create-transaction', {'receiver_iban': receiver.iban, 'amount': '1.00'}
+
+
+def deposit(accounts, index):
+    return 'post', 'deposit', {'amount': '1.00'}
+
+
+def withdraw(accounts, index):
+    return 'post', 'withdraw', {'amount': '1.00'}
+
+
+def history(accounts, index):
+    return 'get', 'client-transaction-list', None
+
+
+SCENARIOS = {
+    'transfer': transfer,
+    'deposit': deposit,
+    'withdraw': withdraw,
+    'history': history,
+}
+
+
+def run_scenario(build_request, seeded, requests_per_client, think_time):
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+
+    accounts = [account for _, account, _ in seeded]
+    latencies = []
+    errors = []
+    rejections = []
+    queries = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(len(seeded) + 1)
+
+    def simulated_client(index, token):
+        client = Client()
+        headers = {'Authorization': f'Bearer {token}'}
+        counter = QueryCounter()
+        local_latencies = []
+        local_errors = 0
+        local_rejections = 0
+        start_gate.wait()
+        with connection.execute_wrapper(counter):
+            for _ in range(requests_per_client):
+                method, url_name, data = build_request(accounts, index)
+                started = time.perf_counter()
+                if method == 'post':
+                    response = client.post(reverse(url_name), data, content_type='application/json',
+                                           headers=headers)
+                else:
+                    response = client.get(reverse(url_name), headers=headers)
+                local_latencies.append(time.perf_counter() - started)
+                if response.status_code == 400 and \
+                        response.json().get('detail', '').startswith('Velocity limit exceeded'):
+                    local_rejections += 1
+                else:
+                    local_errors += response.status_code >= 400
+                if think_time:
+                    time.sleep(random.uniform(0, think_time))
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+            rejections.append(local_rejections)
+            queries.append(counter.count)
+
+    threads = [
+        threading.Thread(target=simulated_client, args=(index, token))
+        for index, (_, _, token) in enumerate(seeded)
+    ]
+    for thread in threads:
+        thread.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    summary = summarize(latencies, elapsed, errors=sum(errors), queries=sum(queries))
+    summary['velocity_rejections'] = sum(rejections)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=10, help='Concurrent simulated clients')
+    parser.add_argument('--requests-per-client', type=int, default=50)
+    parser.add_argument('--transactions-per-client', type=int, default=500,
+                        help='History rows seeded per account before the run')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='Maximum random pause in seconds between a client\'s requests')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Repeat to pick scenarios; defaults to all of them')
+    parser.add_argument('--velocity-limits', action='store_true',
+                        help='Keep the configured VELOCITY_LIMITS instead of disabling them')
+    parser.add_argument('--label', help='Free-form tag stored in the report, e.g. a release name')
+    parser.add_argument('--output', help='Also write the JSON report to this file')
+    add_database_argument(parser)
+    args = parser.parse_args()
+    setup(args.database, velocity_limits=args.velocity_limits)
+
+    report = {'parameters': vars(args), 'scenarios': {}}
+    with benchmark_database():
+        report['environment'] = environment()
+        seeded = seed(args.clients, args.transactions_per_client)
+        for name in args.scenario or sorted(SCENARIOS):
+            report['scenarios'][name] = run_scenario(SCENARIOS[name], seeded, args.requests_per_client,
+                                                     args.think_time)
+    emit(report, args.output)
+
+
+if __name__ == '__main__':
+    main()